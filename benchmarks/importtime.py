@@ -0,0 +1,55 @@
+'''
+Import time of geo and its submodules, measured with python -X importtime.
+
+    python benchmarks/importtime.py [runs]
+
+Imports each module in a fresh interpreter `runs` times and reports the best
+total (the sum of the cumulative times of the top-level imports, leaving out
+those of the interpreter's own startup), and the slowest imports it brought
+in. The package is byte-compiled first, so that compiling a module that has
+changed since it was last imported isn't counted.
+'''
+import compileall
+import os
+import subprocess
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+modules = ['geo', 'geo.types', 'geo.rtree', 'geo.shapefile', 'geo.shapefile.reader', 'geo.shapefile.writer',
+           'geo.spatial']
+
+
+def import_times(statement):
+    # {imported module: cumulative microseconds} for one fresh interpreter
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            env=env, stderr=subprocess.PIPE, universal_newlines=True, check=True).stderr
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # (keeping the indentation, which is the depth of the import)
+        times[name[1:].rstrip()] = int(cumulative)
+    return times
+
+
+def total(times):
+    # only the top-level imports (deeper ones are indented) add up
+    return sum(us for name, us in times.items() if not name.startswith(' '))
+
+
+def main(runs=9):
+    compileall.compile_dir(os.path.join(root, 'geo'), quiet=1)
+    startup = set(name.strip() for name in import_times('pass'))
+    for module in modules:
+        best = min(({name: us for name, us in import_times('import ' + module).items()
+                     if name.strip() not in startup} for _ in range(runs)), key=total)
+        slowest = sorted((us, name.strip()) for name, us in best.items() if name.strip() != module)[::-1][:4]
+        print('import %-22s %6.1f ms  (%s)' % (
+            module + ':', total(best) / 1000.0, ', '.join('%s %.1f' % (name, us / 1000.0) for us, name in slowest)))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,53 @@
+'''
+Throughput of FeatureCollection.locate_many against a loop over
+first_feature_containing, on rings of increasing size.
+
+    python benchmarks/locate.py [count]
+
+Each collection holds a single wavy ring of the given number of vertices
+(with a hole), and `count` random points around it are located both ways.
+'''
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geo.types import Feature, FeatureCollection
+
+
+def wavy_ring(n, radius=1.0, lobes=12):
+    angles = [t * 2 * math.pi / n for t in range(n)]
+    return [(radius * (1 + 0.1 * math.sin(lobes * a)) * math.cos(a),
+             radius * (1 + 0.1 * math.sin(lobes * a)) * math.sin(a)) for a in angles]
+
+
+def best(function, runs=3):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main(count=20000):
+    random.seed(0)
+    lons = [random.uniform(-1.2, 1.2) for _ in range(count)]
+    lats = [random.uniform(-1.2, 1.2) for _ in range(count)]
+    for n in (20, 200, 2000, 20000):
+        geometry = {'type': 'Polygon', 'coordinates': [wavy_ring(n), wavy_ring(n, 0.3)[::-1]]}
+        collection = FeatureCollection([Feature(geometry, {})])
+        collection.features[0].prepared()
+        many, located = best(lambda: collection.locate_many(lons, lats))
+        scalar, features = best(lambda: [collection.first_feature_containing(lon, lat)
+                                         for lon, lat in zip(lons, lats)])
+        assert located.tolist() == [-1 if feature is None else 0 for feature in features]
+        print('%d points, %5d-vertex ring: locate_many %7.1f ms, first_feature_containing %7.1f ms (%.1fx)' % (
+            count, n, many * 1e3, scalar * 1e3, scalar / many))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,100 @@
+'''
+Memory used by features and shapes, measured with tracemalloc.
+
+    python benchmarks/memory.py [count]
+
+Builds `count` small polygon features (13-vertex rings, like census blocks)
+with an id, properties and a BoundingBox, once with geo.types' classes and
+once with equivalent plain classes that keep a per-instance __dict__, and
+reads `count` polygon shapes back from a shapefile with each Reader mode.
+'''
+import gc
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geo.types import BoundingBox, Feature
+from geo.shapefile.reader import Reader
+from geo.shapefile.writer import Writer
+
+
+class DictBoundingBox(object):
+    def __init__(self, min_x, min_y, max_x, max_y):
+        self.min_x = min_x
+        self.min_y = min_y
+        self.max_x = max_x
+        self.max_y = max_y
+
+
+class DictFeature(object):
+    def __init__(self, geometry, properties, id=None, bbox=None):
+        self.geometry = geometry
+        self._prepared = None
+        self.properties = properties
+        self.id = id
+        self.bbox = bbox
+
+
+def ring(cx, cy, r=0.01, n=12):
+    points = [[cx + r * math.cos(t * 2 * math.pi / n), cy + r * math.sin(t * 2 * math.pi / n)] for t in range(n)]
+    return points + [points[0]]
+
+
+def measure(build):
+    # bytes still allocated by the result of build()
+    gc.collect()
+    start = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - start
+    del result
+    return used
+
+
+def build_features(rings, feature_cls, bbox_cls):
+    features = []
+    for i, points in enumerate(rings):
+        xs, ys = zip(*points)
+        geometry = {'type': 'Polygon', 'coordinates': [points]}
+        features.append(feature_cls(geometry, {'GEOID': '%015d' % i}, id=str(i),
+                                    bbox=bbox_cls(min(xs), min(ys), max(xs), max(ys))))
+    return features
+
+
+def main(count=20000):
+    random.seed(0)
+    centers = [(random.uniform(-120, -70), random.uniform(25, 48)) for _ in range(count)]
+    tracemalloc.start()
+    # the geometries themselves are shared by both runs, so only the
+    # feature objects (and their properties, ids and boxes) are counted
+    rings = [ring(cx, cy) for cx, cy in centers]
+    for name, feature_cls, bbox_cls in (('plain classes', DictFeature, DictBoundingBox),
+                                        ('geo.types', Feature, BoundingBox)):
+        used = measure(lambda: build_features(rings, feature_cls, bbox_cls))
+        print('%d features, %-14s %6.2f MB (%d bytes each)' % (count, name + ':', used / 1e6, used // count))
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'blocks')
+        writer = Writer()
+        writer.field('ID', 'N', 10)
+        for i, (cx, cy) in enumerate(centers):
+            writer.poly(parts=[ring(cx, cy)])
+            writer.record(i)
+        writer.save(path)
+        for options in ({}, {'coords': 'array'}, {'lazy': True}):
+            used = measure(lambda: list(Reader(path, **options).shapes()))
+            print('%d shapes, Reader(%-16s %6.2f MB (%d bytes each)' % (
+                count, ', '.join('%s=%r' % item for item in options.items()) + '):', used / 1e6, used // count))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
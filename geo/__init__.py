@@ -4,5 +4,35 @@ here = os.path.dirname(__file__) or os.curdir
 # root is the directory containing `here`, i.e., the directory containing setup.py
 root = os.path.dirname(os.path.abspath(here))
 
-import pkg_resources
-__version__ = pkg_resources.get_distribution('geo').version
+# submodules (and __version__) are only loaded on first access, so that
+# `import geo` doesn't pay for the packaging metadata or for NumPy
+_submodules = ('rtree', 'shapefile', 'shapes', 'spatial', 'types')
+
+
+def _version():
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        # Python < 3.8
+        import pkg_resources
+        return pkg_resources.get_distribution('geo').version
+    try:
+        return version('geo')
+    except PackageNotFoundError:
+        raise AttributeError("__version__ (the geo distribution is not installed)")
+
+
+def __getattr__(name):
+    if name == '__version__':
+        value = _version()
+    elif name in _submodules:
+        import importlib
+        value = importlib.import_module('geo.' + name)
+    else:
+        raise AttributeError("module 'geo' has no attribute '%s'" % name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_submodules) | {'__version__'})
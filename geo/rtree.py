@@ -0,0 +1,164 @@
+from array import array
+from bisect import bisect_right
+from struct import pack, unpack
+import sys
+
+
+def hilbert(x, y, order=16):
+    '''
+    Position of the integer point (x, y), with 0 <= x, y < 2**order, along
+    a Hilbert curve filling that square.
+    '''
+    d = 0
+    s = 1 << (order - 1)
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        # rotate the quadrant so that the curve stays continuous
+        if ry == 0:
+            if rx == 1:
+                x = s - 1 - (x & (s - 1))
+                y = s - 1 - (y & (s - 1))
+            x, y = y, x
+        s >>= 1
+    return d
+
+
+def intersects(a, b):
+    '''
+    Check whether two (min_x, min_y, max_x, max_y) boxes overlap (or touch)
+    '''
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class RTree(object):
+    '''
+    RTree(boxes, ids=None, node_size=16)
+
+    A static, packed Hilbert R-tree over a list of (min_x, min_y, max_x, max_y)
+    boxes. Boxes are sorted by the Hilbert value of their centers and packed
+    bottom-up into nodes of node_size entries, so the whole tree lives in two
+    flat arrays:
+
+    boxes = array('d')   # 4 values per entry: the items, then each level of nodes
+    indices = array('i') # for items, the item's id; for nodes, the position
+                         # of the node's first child entry
+
+    ids = list of ints   # the id to return for each box (defaults to its position)
+
+    node_size must be at least 2.
+    '''
+    def __init__(self, boxes, ids=None, node_size=16):
+        if node_size < 2:
+            raise ValueError('node_size must be at least 2')
+        self.node_size = node_size
+        self.num_items = len(boxes)
+        self.level_bounds = self._level_bounds(self.num_items, node_size)
+        if ids is None:
+            ids = range(self.num_items)
+        self.boxes = array('d')
+        self.indices = array('i')
+        if not boxes:
+            return
+        # sort the items along a Hilbert curve over the extent of their centers
+        min_x = min(box[0] for box in boxes)
+        min_y = min(box[1] for box in boxes)
+        max_x = max(box[2] for box in boxes)
+        max_y = max(box[3] for box in boxes)
+        scale_x = 0xffff / (max_x - min_x) if max_x > min_x else 0
+        scale_y = 0xffff / (max_y - min_y) if max_y > min_y else 0
+        values = [hilbert(int(((box[0] + box[2]) / 2 - min_x) * scale_x),
+                          int(((box[1] + box[3]) / 2 - min_y) * scale_y)) for box in boxes]
+        order = sorted(range(self.num_items), key=values.__getitem__)
+        for i in order:
+            self.boxes.extend(boxes[i][:4])
+            self.indices.append(ids[i])
+        # pack each level into parent nodes
+        start = 0
+        for end in self.level_bounds[:-1]:
+            for child in range(start, end, node_size):
+                last = min(child + node_size, end)
+                child_boxes = self.boxes[4 * child:4 * last]
+                self.boxes.extend((min(child_boxes[0::4]), min(child_boxes[1::4]),
+                                   max(child_boxes[2::4]), max(child_boxes[3::4])))
+                self.indices.append(child)
+            start = end
+
+    @staticmethod
+    def _level_bounds(num_items, node_size):
+        # end position (exclusive) of each level, from the leaves up to the root
+        count = total = num_items
+        level_bounds = [total]
+        while count > 1:
+            count = (count + node_size - 1) // node_size
+            total += count
+            level_bounds.append(total)
+        return level_bounds
+
+    def search(self, min_x, min_y, max_x, max_y):
+        '''
+        Return the ids of all boxes intersecting the given box, in no
+        particular order. For a point query, use min_x == max_x and
+        min_y == max_y.
+        '''
+        results = []
+        if not self.num_items:
+            return results
+        boxes = self.boxes
+        indices = self.indices
+        node_size = self.node_size
+        num_items = self.num_items
+        level_bounds = self.level_bounds
+        queue = []
+        node = len(indices) - 1
+        while node is not None:
+            end = min(node + node_size, level_bounds[bisect_right(level_bounds, node)])
+            for position in range(node, end):
+                i = 4 * position
+                if max_x < boxes[i] or max_y < boxes[i + 1] or min_x > boxes[i + 2] or min_y > boxes[i + 3]:
+                    continue
+                if node < num_items:
+                    results.append(indices[position])
+                else:
+                    queue.append(indices[position])
+            node = queue.pop() if queue else None
+        return results
+
+    def dump(self, fp):
+        '''
+        Write this tree to the binary file-like object fp.
+        '''
+        fp.write(pack('<2i', self.num_items, self.node_size))
+        for values in (self.boxes, self.indices):
+            if sys.byteorder == 'big':
+                values = array(values.typecode, values)
+                values.byteswap()
+            fp.write(values.tobytes())
+
+    @classmethod
+    def load(cls, fp):
+        '''
+        Read a tree written by dump() from the binary file-like object fp.
+        Raises ValueError if fp is truncated or doesn't hold such a tree.
+        '''
+        tree = cls.__new__(cls)
+        header = fp.read(8)
+        if len(header) < 8:
+            raise ValueError('truncated tree')
+        tree.num_items, tree.node_size = unpack('<2i', header)
+        if tree.num_items < 0 or tree.node_size < 2:
+            raise ValueError('not a tree written by dump()')
+        tree.level_bounds = cls._level_bounds(tree.num_items, tree.node_size)
+        total = tree.level_bounds[-1] if tree.num_items else 0
+        tree.boxes = array('d')
+        tree.indices = array('i')
+        for values, size in ((tree.boxes, total * 4), (tree.indices, total)):
+            data = fp.read(size * values.itemsize)
+            if len(data) < size * values.itemsize:
+                raise ValueError('truncated tree')
+            values.frombytes(data)
+        if sys.byteorder == 'big':
+            tree.boxes.byteswap()
+            tree.indices.byteswap()
+        return tree
@@ -28,3 +28,26 @@ def signed_area(coords):
     xs.append(xs[1])
     ys.append(ys[1])
     return sum(xs[i]*(ys[i+1]-ys[i-1]) for i in range(1, len(coords)))/2.0
+
+_numpy = []
+
+def _importNumpy():
+    """Returns NumPy, or None if it isn't installed. It's imported on first
+    use, so that reading shapefiles only pays for it when it's needed."""
+    if not _numpy:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy.append(numpy)
+    return _numpy[0]
+
+# The reader, writer and editor (and what they import) are only loaded when
+# first accessed as attributes of this package
+_submodules = ("editor", "reader", "shape", "six", "types", "writer")
+
+def __getattr__(name):
+    if name not in _submodules:
+        raise AttributeError("module 'geo.shapefile' has no attribute '%s'" % name)
+    import importlib
+    return importlib.import_module("geo.shapefile." + name)
@@ -1,9 +1,38 @@
-from struct import unpack, calcsize
+from struct import Struct, pack, unpack, unpack_from, calcsize
+from copy import copy
+import mmap
 import os
+import sys
 
-from geo.shapefile import ShapefileException, Array
+from geo.shapefile import ShapefileException, Array, _importNumpy
 from geo.shapefile.six import u, b, is_string
-from geo.shapefile.shape import Shape
+from geo.shapefile.shape import Shape, LazyShape
+from geo.rtree import RTree, intersects
+
+
+# Each worker process of Reader.parallelShapeRecords() opens its own Reader,
+# on its first chunk rather than in the pool initializer, so that an error
+# opening it reaches the caller instead of making the pool respawn workers
+_workerArgs = None
+_workerReader = None
+
+def _initWorker(shapefile, kwargs):
+    global _workerArgs
+    _workerArgs = (shapefile, kwargs)
+
+def _decodeRange(bounds):
+    """Decodes the shapes and records with indices in range(*bounds)."""
+    global _workerReader
+    start, stop = bounds
+    if _workerReader is None:
+        shapefile, kwargs = _workerArgs
+        _workerReader = Reader(shapefile, **kwargs)
+    reader = _workerReader
+    results = []
+    for i in range(start, stop):
+        record = reader.record(i) if reader.dbf else None
+        results.append((i, reader.shape(i), record))
+    return results
 
 
 class Reader(object):
@@ -23,17 +52,53 @@ class Reader(object):
     within each file is only accessed when required and as
     efficiently as possible. Shapefiles are usually not large
     but they can be.
+
+    Passing mmap=True memory-maps the three files once and decodes
+    records directly from slices of the mapping, instead of issuing
+    a read() for every field. Call close() (or use the Reader as a
+    context manager) to release the mappings.
+
+    By default a shape's points are decoded into a list of [x, y]
+    arrays. Passing coords='array' instead decodes them (and any z or
+    m values) with one bulk copy into a single flat array('d') per
+    shape, stored as shape.coords; coords='numpy' returns NumPy views
+    of shape (n, 2) over the record bytes (and over the mapping, in
+    mmap mode). shape.points is then only built if it is accessed. In
+    these modes m values are returned as-is, with nodata values
+    (less than -10e38) left in place rather than replaced by None.
+
+    Passing lazy=True returns LazyShapes, which keep the raw record and
+    only decode bbox, parts, points (or coords), z and m when each is
+    first accessed. This is the cheapest way to skim a file for shape
+    types or bounding boxes. Shapes from parallelShapeRecords() are
+    always decoded up front.
+
+    buildIndex() saves an R-tree over the shapes' bounding boxes as a
+    .rtx file next to the .shp. When a fresh one is found, bbox queries
+    read only the records it returns as candidates.
     """
     def __init__(self, *args, **kwargs):
         self.shp = None
         self.shx = None
         self.dbf = None
+        self._mmap = kwargs.get("mmap", False)
+        self._coords = kwargs.get("coords", None)
+        self._lazy = kwargs.get("lazy", False)
+        if self._coords not in (None, "array", "numpy"):
+            raise ShapefileException("coords must be None, 'array', or 'numpy'.")
+        if self._coords == "numpy" and _importNumpy() is None:
+            raise ShapefileException("coords='numpy' requires NumPy to be installed.")
+        self._views = {}
+        self._maps = []
         self.shapeName = "Not specified"
         self._offsets = []
+        self._lengths = []
         self.shpLength = None
         self.numRecords = None
         self.fields = []
         self.__dbfHdrLength = 0
+        self.__recFmt = None
+        self._index = None
         # See if a shapefile name was passed as an argument
         if len(args) > 0:
             if is_string(args[0]):
@@ -79,11 +144,65 @@ class Reader(object):
                 self.dbf = open("%s.dbf" % shapeName, "rb")
             except IOError:
                 raise ShapefileException("Unable to open %s.dbf" % shapeName)
+        if self._mmap and not self._views:
+            self.__mapFiles()
         if self.shp:
             self.__shpHeader()
         if self.dbf:
             self.__dbfHeader()
 
+    def __mapFiles(self):
+        """Maps each available file into memory. File-like objects that are
+        not backed by a real file descriptor are read into memory instead."""
+        for attr in ("shp", "shx", "dbf"):
+            f = getattr(self, attr)
+            if not f:
+                continue
+            try:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps.append(m)
+                buf = m
+            except (AttributeError, IOError, OSError, ValueError):
+                f.seek(0)
+                buf = f.read()
+                f.seek(0)
+            self._views[attr] = memoryview(buf)
+
+    def __readAt(self, attr, offset, size):
+        """Returns size bytes from the given file ('shp', 'shx', or 'dbf')
+        starting at offset. In mmap mode this is a zero-copy memoryview
+        slice of the mapping; otherwise it is a single seek() and read()."""
+        view = self._views.get(attr)
+        if view is not None:
+            return view[offset:offset + size]
+        f = getattr(self, attr)
+        f.seek(offset)
+        return f.read(size)
+
+    def close(self):
+        """Closes the underlying files and releases any memory maps."""
+        for view in self._views.values():
+            view.release()
+        self._views = {}
+        for m in self._maps:
+            try:
+                m.close()
+            except BufferError:
+                # Shapes decoded without copies still reference the
+                # mapping; it is unmapped once they are garbage collected.
+                pass
+        self._maps = []
+        for attr in ("shp", "shx", "dbf"):
+            f = getattr(self, attr)
+            if f and hasattr(f, "close"):
+                f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def __getFileObj(self, f):
         """Checks to see if the requested shapefile file object is
         available. If not a ShapefileException is raised."""
@@ -130,64 +249,108 @@ class Reader(object):
         # Measure
         self.measure = Array('d', unpack("<2d", shp.read(16)))
 
-    def __shape(self):
-        """Returns the header info and geometry for a single shape."""
-        f = self.__getFileObj(self.shp)
+    def __shape(self, offset):
+        """Returns the header info and geometry for the shape record
+        starting at offset, along with the offset of the next record."""
+        self.__getFileObj(self.shp)
+        (recNum, recLength) = unpack(">2i", self.__readAt("shp", offset, 8))
+        # Determine the start of the next record. The content is read
+        # up to there because the shapefile spec doesn't require the
+        # actual content to meet the header definition. Probably allowed
+        # for lazy feature deletion.
+        next = offset + 8 + (2 * recLength)
+        buf = self.__readAt("shp", offset + 8, 2 * recLength)
+        if self._lazy:
+            return LazyShape(buf, offset, self.__doubles, self._coords, not 0.0 in self.measure), next
+        return self.__decodeShape(buf), next
+
+    def __doubles(self, buf, pos, count, width=1):
+        """Decodes count little-endian doubles from buf at pos with a single
+        bulk copy (or none at all, for NumPy views)."""
+        if self._coords == "numpy":
+            values = _importNumpy().frombuffer(buf, "<f8", count, pos)
+            return values.reshape(-1, width) if width > 1 else values
+        values = Array('d')
+        values.frombytes(buf[pos:pos + count * 8])
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def __decodeShape(self, buf):
+        """Decodes the content of a single shape record from buf, which is
+        either the bytes of the record or a memoryview slice of the mapping."""
         record = Shape()
         nParts = nPoints = zmin = zmax = mmin = mmax = None
-        (recNum, recLength) = unpack(">2i", f.read(8))
-        # Determine the start of the next record
-        next = f.tell() + (2 * recLength)
-        shapeType = unpack("<i", f.read(4))[0]
+        shapeType = unpack_from("<i", buf, 0)[0]
+        pos = 4
         record.shapeType = shapeType
         # For Null shapes create an empty points list for consistency
         if shapeType == 0:
             record.points = []
         # All shape types capable of having a bounding box
         elif shapeType in (3, 5, 8, 13, 15, 18, 23, 25, 28, 31):
-            record.bbox = Array('d', unpack("<4d", f.read(32)))
+            record.bbox = Array('d', unpack_from("<4d", buf, pos))
+            pos += 32
         # Shape types with parts
         if shapeType in (3, 5, 13, 15, 23, 25, 31):
-            nParts = unpack("<i", f.read(4))[0]
+            nParts = unpack_from("<i", buf, pos)[0]
+            pos += 4
         # Shape types with points
         if shapeType in (3, 5, 8, 13, 15, 23, 25, 31):
-            nPoints = unpack("<i", f.read(4))[0]
+            nPoints = unpack_from("<i", buf, pos)[0]
+            pos += 4
         # Read parts
         if nParts:
-            record.parts = Array('i', unpack("<%si" % nParts, f.read(nParts * 4)))
+            record.parts = Array('i', unpack_from("<%si" % nParts, buf, pos))
+            pos += nParts * 4
         # Read part types for Multipatch - 31
         if shapeType == 31:
-            record.partTypes = Array('i', unpack("<%si" % nParts, f.read(nParts * 4)))
+            record.partTypes = Array('i', unpack_from("<%si" % nParts, buf, pos))
+            pos += nParts * 4
         # Read points - produces a list of [x,y] values
         if nPoints:
-            record.points = [Array('d', unpack("<2d", f.read(16))) for p in range(nPoints)]
+            if self._coords:
+                record.coords = self.__doubles(buf, pos, 2 * nPoints, 2)
+            else:
+                xy = unpack_from("<%sd" % (2 * nPoints), buf, pos)
+                record.points = [Array('d', xy[i:i + 2]) for i in range(0, 2 * nPoints, 2)]
+            pos += nPoints * 16
         # Read z extremes and values
         if shapeType in (13, 15, 18, 31):
-            (zmin, zmax) = unpack("<2d", f.read(16))
-            record.z = Array('d', unpack("<%sd" % nPoints, f.read(nPoints * 8)))
+            (zmin, zmax) = unpack_from("<2d", buf, pos)
+            if self._coords:
+                record.z = self.__doubles(buf, pos + 16, nPoints)
+            else:
+                record.z = Array('d', unpack_from("<%sd" % nPoints, buf, pos + 16))
+            pos += 16 + nPoints * 8
         # Read m extremes and values if header m values do not equal 0.0
         if shapeType in (13, 15, 18, 23, 25, 28, 31) and not 0.0 in self.measure:
-            (mmin, mmax) = unpack("<2d", f.read(16))
-            # Measure values less than -10e38 are nodata values according to the spec
-            record.m = []
-            for m in Array('d', unpack("<%sd" % nPoints, f.read(nPoints * 8))):
-                if m > -10e38:
-                    record.m.append(m)
-                else:
-                    record.m.append(None)
+            (mmin, mmax) = unpack_from("<2d", buf, pos)
+            if self._coords:
+                record.m = self.__doubles(buf, pos + 16, nPoints)
+            else:
+                # Measure values less than -10e38 are nodata values according to the spec
+                record.m = []
+                for m in unpack_from("<%sd" % nPoints, buf, pos + 16):
+                    if m > -10e38:
+                        record.m.append(m)
+                    else:
+                        record.m.append(None)
+            pos += 16 + nPoints * 8
         # Read a single point
         if shapeType in (1, 11, 21):
-            record.points = [Array('d', unpack("<2d", f.read(16)))]
+            if self._coords:
+                record.coords = self.__doubles(buf, pos, 2, 2)
+            else:
+                record.points = [Array('d', unpack_from("<2d", buf, pos))]
+            pos += 16
         # Read a single Z value
         if shapeType == 11:
-            record.z = unpack("<d", f.read(8))
+            record.z = unpack_from("<d", buf, pos)
+            pos += 8
         # Read a single M value
         if shapeType in (11, 21):
-            record.m = unpack("<d", f.read(8))
-        # Seek to the end of this record as defined by the record header because
-        # the shapefile spec doesn't require the actual content to meet the header
-        # definition.  Probably allowed for lazy feature deletion.
-        f.seek(next)
+            record.m = unpack_from("<d", buf, pos)
         return record
 
     def __shapeIndex(self, i=None):
@@ -201,43 +364,208 @@ class Reader(object):
             shx.seek(24)
             shxRecordLength = (unpack(">i", shx.read(4))[0] * 2) - 100
             numRecords = shxRecordLength // 8
-            # Jump to the first record.
-            shx.seek(100)
-            for r in range(numRecords):
-                # Offsets are 16-bit words just like the file length
-                self._offsets.append(unpack(">i", shx.read(4))[0] * 2)
-                shx.seek(shx.tell() + 4)
+            # Read all records at once; each is a big-endian (offset, length)
+            # pair of 16-bit word counts, just like the file length.
+            index = Array('i')
+            index.frombytes(self.__readAt("shx", 100, numRecords * 8))
+            if sys.byteorder == "little":
+                index.byteswap()
+            self._offsets = index[0::2]
+            self._lengths = index[1::2]
         if not i == None:
-            return self._offsets[i]
+            return self._offsets[i] * 2
+
+    @property
+    def offsets(self):
+        """The offset of every shape record in the .shp file, as read from
+        the .shx index. Like the shapefile spec, offsets are counted in
+        16-bit words; multiply by 2 for bytes."""
+        self.__shapeIndex()
+        return self._offsets
+
+    @property
+    def lengths(self):
+        """The content length of every shape record in the .shp file, in
+        16-bit words, as read from the .shx index."""
+        self.__shapeIndex()
+        return self._lengths
 
     def shape(self, i=0):
         """Returns a shape object for a shape in the the geometry
         record file."""
-        shp = self.__getFileObj(self.shp)
+        self.__getFileObj(self.shp)
         i = self.__restrictIndex(i)
         offset = self.__shapeIndex(i)
         if not offset:
             # Shx index not available so iterate the full list.
-            for j, k in enumerate(self.iterShapes()):
+            for j, k in enumerate(self.shapes()):
                 if j == i:
                     return k
-        shp.seek(offset)
-        return self.__shape()
+        return self.__shape(offset)[0]
 
-    def shapes(self):
+    def shapes(self, bbox=None):
         """
         Yield all shapes in the shapefile.
+
+        If bbox=(minx, miny, maxx, maxy) is given, only the 44-byte prefix
+        (record header, shape type and bounding box) of each record is
+        read, and only the shapes whose bounding box intersects bbox are
+        decoded and yielded. Points are tested by their coordinates and
+        null shapes never match.
         """
+        for i, record in self.__iterShapes(bbox):
+            yield record
+
+    def iterShapeRecords(self, bbox=None):
+        """
+        Yield (shape, record) pairs for all shapes in the shapefile, or
+        only those intersecting bbox, as in shapes().
+        """
+        for i, record in self.__iterShapes(bbox):
+            yield record, self.record(i)
+
+    def __iterShapes(self, bbox=None):
+        """Yields (index, shape) for every shape, or every shape whose
+        bounding box intersects bbox."""
         shp = self.__getFileObj(self.shp)
+        if bbox is not None and self.__spatialIndex():
+            for i in sorted(self._index.search(*bbox)):
+                yield i, self.__shape(self.__shapeIndex(i))[0]
+            return
         # Found shapefiles which report incorrect
         # shp file length in the header. Can't trust
         # that so we seek to the end of the file
         # and figure it out.
         shp.seek(0, 2)
         self.shpLength = shp.tell()
-        shp.seek(100)
-        while shp.tell() < self.shpLength:
-            yield self.__shape()
+        offset = 100
+        i = 0
+        while offset < self.shpLength:
+            if bbox is None:
+                record, offset = self.__shape(offset)
+                yield i, record
+            else:
+                bounds, next = self.__bounds(offset)
+                if bounds and intersects(bounds, bbox):
+                    yield i, self.__shape(offset)[0]
+                offset = next
+            i += 1
+
+    def __bounds(self, offset):
+        """Reads only the 44-byte prefix (record header, shape type and
+        bounding box) of the record at offset and returns its bounding box,
+        or None for null shapes, along with the offset of the next record.
+        Points are returned as a box of zero size."""
+        (recNum, recLength) = unpack(">2i", self.__readAt("shp", offset, 8))
+        next = offset + 8 + (2 * recLength)
+        prefix = self.__readAt("shp", offset + 8, min(36, 2 * recLength))
+        shapeType = unpack_from("<i", prefix, 0)[0]
+        if shapeType in (1, 11, 21):
+            x, y = unpack_from("<2d", prefix, 4)
+            return (x, y, x, y), next
+        elif shapeType in (3, 5, 8, 13, 15, 18, 23, 25, 28, 31):
+            return unpack_from("<4d", prefix, 4), next
+        return None, next
+
+    def __indexPath(self):
+        return "%s.rtx" % self.shapeName
+
+    def __shpStat(self):
+        """The size and modification time of the .shp file, which the
+        .rtx sidecar records to detect when it has gone stale."""
+        stat = os.stat("%s.shp" % self.shapeName)
+        return stat.st_size, stat.st_mtime
+
+    def buildIndex(self, save=True, node_size=16):
+        """
+        Builds a packed Hilbert R-tree over the bounding boxes of all
+        shapes, reading only the 44-byte prefix of each record, and uses
+        it for subsequent bbox queries. Point queries are bbox queries
+        with minx == maxx and miny == maxy. Unless save is False, the tree
+        is also written to a .rtx sidecar next to the .shp, stamped with
+        the .shp size and modification time so that later Readers can
+        tell whether it is still fresh. Returns the tree.
+        """
+        shp = self.__getFileObj(self.shp)
+        shp.seek(0, 2)
+        self.shpLength = shp.tell()
+        boxes = []
+        ids = []
+        offset = 100
+        i = 0
+        while offset < self.shpLength:
+            bounds, offset = self.__bounds(offset)
+            # Null shapes are left out of the tree so they never match
+            if bounds:
+                boxes.append(bounds)
+                ids.append(i)
+            i += 1
+        self._index = RTree(boxes, ids, node_size)
+        if save:
+            if self.shapeName == "Not specified":
+                raise ShapefileException("Saving a spatial index requires a Reader loaded from a file name.")
+            size, mtime = self.__shpStat()
+            with open(self.__indexPath(), "wb") as f:
+                f.write(pack("<4sqd", b("RTX1"), size, mtime))
+                self._index.dump(f)
+        return self._index
+
+    def __spatialIndex(self):
+        """Returns the spatial index built by buildIndex() or loaded from a
+        fresh .rtx sidecar, or None if neither is available. Random access
+        to the candidate records requires the .shx file. A truncated or
+        corrupt .rtx file is ignored, like a stale one."""
+        if self._index is None:
+            self._index = False
+            path = self.__indexPath()
+            if self.shapeName != "Not specified" and os.path.exists(path):
+                with open(path, "rb") as f:
+                    header = f.read(20)
+                    if len(header) == 20:
+                        magic, size, mtime = unpack("<4sqd", header)
+                        if magic == b("RTX1") and (size, mtime) == self.__shpStat():
+                            try:
+                                self._index = RTree.load(f)
+                            except ValueError:
+                                pass
+        return self._index if self.shx else None
+
+    def parallelShapeRecords(self, processes=None, chunksize=1024, ordered=True):
+        """
+        Decode all shapes and their dbf records in a pool of processes,
+        yielding (index, shape, record) tuples. The record range is split
+        into chunks of chunksize records using the .shx offsets, and each
+        worker process opens the shapefile itself (with the same mmap and
+        coords options as this Reader). processes defaults to the number
+        of CPUs. With ordered=False, chunks are yielded as soon as they
+        are decoded rather than in file order.
+
+        Deleted dbf records are yielded as None rather than skipped, so
+        that every shape is accounted for.
+        """
+        if self.shapeName == "Not specified":
+            raise ShapefileException("Parallel decoding requires a Reader loaded from a file name.")
+        if not self.shx:
+            raise ShapefileException("Parallel decoding requires a .shx index file.")
+        numRecords = len(self.offsets)
+        chunks = [(start, min(start + chunksize, numRecords))
+                  for start in range(0, numRecords, chunksize)]
+        options = dict(mmap=self._mmap, coords=self._coords)
+        # (imported here, as it's most of the cost of importing this module)
+        import multiprocessing
+        pool = multiprocessing.Pool(processes, _initWorker, (self.shapeName + ".shp", options))
+        try:
+            if ordered:
+                results = pool.imap(_decodeRange, chunks)
+            else:
+                results = pool.imap_unordered(_decodeRange, chunks)
+            for chunk in results:
+                for result in chunk:
+                    yield result
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
 
     def __dbfHeaderLength(self):
         """Retrieves the header length of a dbf file header."""
@@ -272,15 +600,17 @@ class Reader(object):
         """Calculates the size of a .shp geometry record."""
         if not self.numRecords:
             self.__dbfHeader()
-        fmt = ''.join(['%ds' % fieldinfo[2] for fieldinfo in self.fields])
-        fmtSize = calcsize(fmt)
-        return (fmt, fmtSize)
+        if not self.__recFmt:
+            fmt = ''.join(['%ds' % fieldinfo[2] for fieldinfo in self.fields])
+            fmtSize = calcsize(fmt)
+            self.__recFmt = (fmt, fmtSize)
+        return self.__recFmt
 
-    def __record(self):
-        """Reads and returns a dbf record row as a list of values."""
-        f = self.__getFileObj(self.dbf)
+    def __record(self, offset):
+        """Reads and returns the dbf record row starting at offset as a list of values."""
+        self.__getFileObj(self.dbf)
         recFmt = self.__recordFmt()
-        recordContents = unpack(recFmt[0], f.read(recFmt[1]))
+        recordContents = unpack_from(recFmt[0], self.__readAt("dbf", offset, recFmt[1]))
         if recordContents[0] != b(' '):
             # deleted record
             return None
@@ -288,41 +618,42 @@ class Reader(object):
         for (name, typ, size, deci), value in zip(self.fields, recordContents):
             if name == 'DeletionFlag':
                 continue
-            elif not value.strip():
-                record.append(value)
-                continue
-            elif typ == "N":
-                value = value.replace(b('\0'), b('')).strip()
-                if value == b(''):
-                    value = 0
-                elif deci:
-                    value = float(value)
-                else:
-                    value = int(value)
-            elif typ == b('D'):
-                try:
-                    y, m, d = int(value[:4]), int(value[4:6]), int(value[6:8])
-                    value = [y, m, d]
-                except:
-                    value = value.strip()
-            elif typ == b('L'):
-                value = (value in b('YyTt') and b('T')) or (value in b('NnFf') and b('F')) or b('?')
+            record.append(self.__value(typ, deci, value))
+        return record
+
+    def __value(self, typ, deci, value):
+        """Converts the raw bytes of a single dbf field to a python value."""
+        if not value.strip():
+            return value
+        elif typ == "N":
+            value = value.replace(b('\0'), b('')).strip()
+            if value == b(''):
+                value = 0
+            elif deci:
+                value = float(value)
             else:
-                value = u(value)
+                value = int(value)
+        elif typ == b('D'):
+            try:
+                y, m, d = int(value[:4]), int(value[4:6]), int(value[6:8])
+                value = [y, m, d]
+            except:
                 value = value.strip()
-            record.append(value)
-        return record
+        elif typ == b('L'):
+            value = (value in b('YyTt') and b('T')) or (value in b('NnFf') and b('F')) or b('?')
+        else:
+            value = u(value)
+            value = value.strip()
+        return value
 
     def record(self, i=0):
         """Returns a specific dbf record based on the supplied index."""
-        f = self.__getFileObj(self.dbf)
+        self.__getFileObj(self.dbf)
         if not self.numRecords:
             self.__dbfHeader()
         i = self.__restrictIndex(i)
         recSize = self.__recordFmt()[1]
-        f.seek(0)
-        f.seek(self.__dbfHeaderLength() + (i * recSize))
-        return self.__record()
+        return self.__record(self.__dbfHeaderLength() + (i * recSize))
 
     def records(self):
         """
@@ -331,13 +662,119 @@ class Reader(object):
         """
         if not self.numRecords:
             self.__dbfHeader()
-        f = self.__getFileObj(self.dbf)
-        f.seek(self.__dbfHeaderLength())
-        for i in xrange(self.numRecords):
-            r = self.__record()
+        self.__getFileObj(self.dbf)
+        offset = self.__dbfHeaderLength()
+        recSize = self.__recordFmt()[1]
+        for i in range(self.numRecords):
+            r = self.__record(offset + (i * recSize))
             if r:
                 yield r
 
+    def columns(self, names=None):
+        """
+        Returns the values of the named dbf fields (all fields by default)
+        as a list of columns, one per name and in the same order, skipping
+        deleted records just like records() does.
+
+        The whole block of fixed-width records is read at once and only
+        the byte ranges of the requested fields are converted. Numeric
+        fields come back as NumPy int64 / float64 arrays when NumPy is
+        installed and as array('q') / array('d') otherwise; character
+        fields as NumPy unicode arrays or lists of str. Blank numeric
+        values become 0 and blank character values ''. Other field types
+        are returned as lists of the same values records() produces.
+
+            names, populations = reader.columns(['NAME', 'POP2005'])
+        """
+        self.__getFileObj(self.dbf)
+        if not self.numRecords:
+            self.__dbfHeader()
+        if names is None:
+            names = self.field_names
+        recSize = self.__recordFmt()[1]
+        block = self.__readAt("dbf", self.__dbfHeaderLength(), self.numRecords * recSize)
+        # Byte offset of each field within a record
+        layout = {}
+        start = 0
+        for name, typ, size, deci in self.fields:
+            layout[name] = (start, typ, size, deci)
+            start += size
+        for name in names:
+            if name not in layout:
+                raise ShapefileException("No field named %s in dbf file." % name)
+        if _importNumpy() is not None:
+            return self.__numpyColumns(block, layout, names)
+        if not isinstance(block, bytes):
+            block = bytes(block)
+        live = [flag == b(' ') for flag in self.__column(block, layout['DeletionFlag'])]
+        allLive = all(live)
+        columns = []
+        for name in names:
+            start, typ, size, deci = layout[name]
+            values = self.__column(block, layout[name])
+            if not allLive:
+                values = [value for value, keep in zip(values, live) if keep]
+            if typ == "N":
+                values = [value.replace(b('\0'), b('')).strip() or b('0') for value in values]
+                if deci:
+                    values = Array('d', [float(value) for value in values])
+                else:
+                    values = Array('q', [int(value) for value in values])
+            elif typ == "C":
+                values = [u(value).strip() for value in values]
+            else:
+                values = [self.__value(typ, deci, value) for value in values]
+            columns.append(values)
+        return columns
+
+    def __column(self, block, field):
+        """Slices one field out of every record in block."""
+        start, typ, size, deci = field
+        recSize = self.__recordFmt()[1]
+        fmt = Struct("%dx%ds%dx" % (start, size, recSize - start - size))
+        return [value for (value,) in fmt.iter_unpack(block)]
+
+    def __numpyColumns(self, block, layout, names):
+        """NumPy implementation of columns(), viewing block as a structured
+        array so that each field is sliced out without copying."""
+        numpy = _importNumpy()
+        recSize = self.__recordFmt()[1]
+        # (a structured dtype can't name a field twice)
+        fieldNames = ['DeletionFlag']
+        for name in names:
+            if name not in fieldNames:
+                fieldNames.append(name)
+        dtype = numpy.dtype({
+            'names': fieldNames,
+            'formats': ['S%d' % layout[name][2] for name in fieldNames],
+            'offsets': [layout[name][0] for name in fieldNames],
+            'itemsize': recSize,
+        })
+        table = numpy.frombuffer(block, dtype, self.numRecords)
+        live = table['DeletionFlag'] == b(' ')
+        if not live.all():
+            table = table[live]
+        columns = []
+        converted = {}
+        for name in names:
+            if name in converted:
+                # a copy, as each column is its own list or array
+                columns.append(copy(converted[name]))
+                continue
+            start, typ, size, deci = layout[name]
+            values = table[name]
+            if typ == "N":
+                values = numpy.char.strip(values)
+                values = numpy.where(values == b(''), b('0'), values)
+                values = values.astype(numpy.float64 if deci else numpy.int64)
+            elif typ == "C":
+                values = numpy.char.decode(numpy.char.strip(values), 'utf-8')
+            else:
+                values = [self.__value(typ, deci, value) for value in values.tolist()]
+            converted[name] = values
+            columns.append(values)
+        return columns
+
     @property
     def field_names(self):
         return [field_name for field_name, _, _, _ in self.fields[1:]]
@@ -1,11 +1,111 @@
-from geo.shapefile import signed_area
+from operator import mul, sub
+from struct import unpack_from
+
+from geo.rtree import RTree
+from geo.spatial import PreparedRing
+from geo.shapefile import Array, _importNumpy
 from geo.shapefile.types import POINT, POINTM, POINTZ
 from geo.shapefile.types import MULTIPOINT, MULTIPOINTM, MULTIPOINTZ
 from geo.shapefile.types import POLYLINE, POLYLINEM, POLYLINEZ
 from geo.shapefile.types import POLYGON, POLYGONM, POLYGONZ
 
 
+def _coordsToPoints(coords):
+    """Splits flat (or NumPy (n, 2)) coordinates into a list of [x, y] arrays."""
+    if getattr(coords, 'ndim', 1) == 2:
+        return [Array('d', xy) for xy in coords.tolist()]
+    return [Array('d', coords[i:i + 2]) for i in range(0, len(coords), 2)]
+
+def _pointsToCoords(points):
+    """Flattens the x and y values of a list of points into one array('d')."""
+    return Array('d', [c for p in points for c in p[:2]])
+
+def _ringAreas(xy, starts, ends):
+    """The signed_area() of each ring xy[start:end] of an (n, 2) NumPy array,
+    all at once; every ring must have at least two points."""
+    numpy = _importNumpy()
+    xs, ys = xy[:, 0], xy[:, 1]
+    yPrev = numpy.roll(ys, 1)
+    yNext = numpy.roll(ys, -1)
+    # signed_area() wraps around to the second point of the ring
+    yNext[ends - 1] = ys[starts + 1]
+    terms = xs * (yNext - yPrev)
+    terms[starts] = 0.0
+    return numpy.add.reduceat(terms, starts) / 2.0
+
+def _ringArea(xs, ys):
+    """signed_area() of the ring with the given x and y values, without
+    building a list of points."""
+    return sum(map(mul, xs[1:], map(sub, ys[2:] + ys[1:2], ys[:-1]))) / 2.0
+
+def _onBoundary(ring, x, y):
+    """Whether (x, y) lies exactly on an edge of the ring."""
+    for p, q in zip(ring, ring[1:] + ring[:1]):
+        if (min(p[0], q[0]) <= x <= max(p[0], q[0]) and min(p[1], q[1]) <= y <= max(p[1], q[1]) and
+                (q[0] - p[0]) * (y - p[1]) == (q[1] - p[1]) * (x - p[0])):
+            return True
+    return False
+
+def _ringPoints(ring):
+    """The vertices of a ring, then the midpoints of its edges."""
+    for p in ring:
+        yield p[0], p[1]
+    for p, q in zip(ring, ring[1:]):
+        yield (p[0] + q[0]) / 2.0, (p[1] + q[1]) / 2.0
+
+def _assemblePolygons(rings, areas, boxes, indexFrom=16):
+    """Groups rings into polygons. Every clockwise ring (negative signed
+    area) is a shell, and every other ring is a hole of the smallest shell
+    containing it. Only the shells whose bounding box contains the hole's
+    are candidates (found through an RTree over the shells once there are
+    at least indexFrom of them), and with more than one, the candidates are
+    tested, smallest first, against one point of the hole: its first vertex
+    (or else edge midpoint) that isn't on the candidate's boundary, as rings
+    may touch. If no test is conclusive, the smallest candidate is taken. A
+    hole that no shell's box contains is a polygon of its own, and so is
+    every ring if none is clockwise. Lists the polygons in the order of their
+    first ring.
+
+    areas and boxes hold the signed area and the (min_x, min_y, max_x, max_y)
+    bounding box of each ring."""
+    shells = [i for i, area in enumerate(areas) if area < 0]
+    holes = [i for i, area in enumerate(areas) if area >= 0]
+    if not shells:
+        return [[ring] for ring in rings]
+    polys = dict((i, [rings[i]]) for i in shells)
+    if holes:
+        tree = RTree([boxes[i] for i in shells], shells) if len(shells) >= indexFrom else None
+        prepared = {}
+        for i in holes:
+            box = boxes[i]
+            candidates = [j for j in (tree.search(*box) if tree else shells)
+                          if boxes[j][0] <= box[0] and boxes[j][1] <= box[1] and
+                          box[2] <= boxes[j][2] and box[3] <= boxes[j][3]]
+            if not candidates:
+                polys[i] = [rings[i]]
+                continue
+            candidates.sort(key=lambda j: -areas[j])
+            shell = candidates[0]
+            if len(candidates) > 1:
+                for j in candidates:
+                    point = next((point for point in _ringPoints(rings[i])
+                                  if not _onBoundary(rings[j], *point)), None)
+                    if point is None:
+                        continue
+                    if j not in prepared:
+                        prepared[j] = PreparedRing(rings[j])
+                    if prepared[j].contains(*point):
+                        shell = j
+                        break
+            polys[shell].append(rings[i])
+    return [polys[i] for i in sorted(polys)]
+
+
 class Shape(object):
+    # Only shapeType and the geometry are always set; the rest is set when
+    # the shape type has it (so hasattr(shape, "z") still tells)
+    __slots__ = ("shapeType", "_points", "_coords", "_parts", "_geo", "bbox", "partTypes", "z", "m")
+
     def __init__(self, shapeType=None):
         """Stores the geometry of the different shape types
         specified in the Shapefile spec. Shape types are
@@ -15,59 +115,244 @@ class Shape(object):
         multiple shapes containing points within a single
         geometry record then those shapes are called parts. Parts
         are designated by their starting index in geometry record's
-        list of shapes."""
+        list of shapes.
+
+        The geometry can be held either as `points`, a list of [x, y]
+        pairs, or as `coords`, a single flat array('d') of
+        x0, y0, x1, y1, ... (or a NumPy array of shape (n, 2)). Whichever
+        one is missing is converted from the other on first access.
+
+        __geo_interface__ is built once and kept until points, coords or
+        parts are reassigned; changing them in place (or changing the
+        returned dict) does not rebuild it."""
         self.shapeType = shapeType
         self.points = []
 
+    @property
+    def points(self):
+        if self._points is None:
+            self._points = _coordsToPoints(self._coords)
+        return self._points
+
+    @points.setter
+    def points(self, points):
+        self._points = points
+        self._coords = None
+        self._geo = None
+
+    @property
+    def parts(self):
+        return self._parts
+
+    @parts.setter
+    def parts(self, parts):
+        self._parts = parts
+        self._geo = None
+
+    @property
+    def coords(self):
+        if self._coords is None:
+            self._coords = _pointsToCoords(self._points)
+        return self._coords
+
+    @coords.setter
+    def coords(self, coords):
+        self._coords = coords
+        self._points = None
+        self._geo = None
+
     @property
     def __geo_interface__(self):
+        if self._geo is None:
+            self._geo = self.__geoInterface()
+        return self._geo
+
+    def __geoInterface(self):
+        """Builds __geo_interface__ in one pass over the points, splitting
+        them at the part offsets; the rings of a multi-part polygon are
+        grouped into polygons by _assemblePolygons."""
         if self.shapeType in [POINT, POINTM, POINTZ]:
-            return dict(type='Point', coordinates=tuple(self.points[0]))
+            return dict(type='Point', coordinates=self.__positions()[0])
         elif self.shapeType in [MULTIPOINT, MULTIPOINTM, MULTIPOINTZ]:
-            return dict(type='MultiPoint', coordinates=tuple([tuple(p) for p in self.points]))
+            return dict(type='MultiPoint', coordinates=tuple(self.__positions()))
         elif self.shapeType in [POLYLINE, POLYLINEM, POLYLINEZ]:
+            positions = self.__positions()
             if len(self.parts) == 1:
-                return dict(type='LineString', coordinates=tuple([tuple(p) for p in self.points]))
-            else:
-                ps = None
-                coordinates = []
-                for part in self.parts:
-                    if ps == None:
-                        ps = part
-                        continue
-                    else:
-                        coordinates.append(tuple([tuple(p) for p in self.points[ps:part]]))
-                        ps = part
-                else:
-                    coordinates.append(tuple([tuple(p) for p in self.points[part:]]))
-                return dict(type='MultiLineString', coordinates=tuple(coordinates))
+                return dict(type='LineString', coordinates=tuple(positions))
+            coordinates = [tuple(positions[start:end]) for start, end in self.__partBounds(positions)]
+            return dict(type='MultiLineString', coordinates=tuple(coordinates))
         elif self.shapeType in [POLYGON, POLYGONM, POLYGONZ]:
+            positions = self.__positions()
             if len(self.parts) == 1:
-                linear_rings = [[tuple(p) for p in self.points]]
-                return dict(type='Polygon', coordinates=linear_rings)
+                return dict(type='Polygon', coordinates=[positions])
+            bounds = self.__partBounds(positions)
+            coordinates = [tuple(positions[start:end]) for start, end in bounds]
+            polys = _assemblePolygons(coordinates, *self.__ringAreasAndBoxes(positions, bounds))
+            if len(polys) == 1:
+                return dict(type='Polygon', coordinates=polys[0])
+            elif len(polys) > 1:
+                return dict(type='MultiPolygon', coordinates=polys)
+
+    def __positions(self):
+        """Lists every point as a tuple, straight from coords if the shape
+        has no points list yet."""
+        if self._points is not None:
+            return [tuple(p) for p in self._points]
+        coords = self._coords
+        if getattr(coords, 'ndim', 1) == 2:
+            return list(map(tuple, coords.tolist()))
+        return list(zip(coords[0::2], coords[1::2]))
+
+    def __partBounds(self, positions):
+        """Lists the (start, end) index of the points of each part."""
+        starts = list(self.parts)
+        return list(zip(starts, starts[1:] + [len(positions)]))
+
+    def __ringAreasAndBoxes(self, positions, bounds, vectorizeFrom=512):
+        """Lists the signed_area() and the bounding box of each ring. When
+        the shape is held as coords and the rings have at least
+        vectorizeFrom points in all, they are computed at once with NumPy
+        (if available), straight from coords; for fewer points NumPy's
+        overhead outweighs the gain."""
+        coords = self._coords if self._points is None else None
+        ndim = getattr(coords, 'ndim', 1)
+        if (coords is not None and bounds[-1][1] - bounds[0][0] >= vectorizeFrom and
+                min(end - start for start, end in bounds) >= 2 and _importNumpy() is not None):
+            numpy = _importNumpy()
+            if ndim == 2:
+                xy = numpy.asarray(coords, dtype=float)
             else:
-                ps = None
-                coordinates = []
-                # TODO: this double-nesting needs fixing as in the simple case
-                for part in self.parts:
-                    if ps == None:
-                        ps = part
-                        continue
-                    else:
-                        coordinates.append(tuple([tuple(p) for p in self.points[ps:part]]))
-                        ps = part
+                xy = numpy.frombuffer(coords, dtype=float).reshape(-1, 2)
+            starts, ends = numpy.array(bounds, dtype=numpy.intp).T
+            xs, ys = xy[:, 0], xy[:, 1]
+            boxes = zip(*[extreme.reduceat(values, starts).tolist() for extreme, values in
+                          ((numpy.minimum, xs), (numpy.minimum, ys), (numpy.maximum, xs), (numpy.maximum, ys))])
+            return _ringAreas(xy, starts, ends).tolist(), list(boxes)
+        if coords is None:
+            xs = [p[0] for p in positions]
+            ys = [p[1] for p in positions]
+        elif ndim == 2:
+            xs, ys = coords[:, 0].tolist(), coords[:, 1].tolist()
+        else:
+            xs, ys = coords[0::2], coords[1::2]
+        areas = []
+        boxes = []
+        for start, end in bounds:
+            ringXs, ringYs = xs[start:end], ys[start:end]
+            areas.append(_ringArea(ringXs, ringYs))
+            boxes.append((min(ringXs), min(ringYs), max(ringXs), max(ringYs)))
+        return areas, boxes
+
+
+class LazyShape(Shape):
+    __slots__ = ("offset", "_buf", "_doubles", "_coordsMode", "_measured", "_nParts", "_nPoints", "_pos")
+
+    def __init__(self, buf, offset, doubles=None, coords=None, measured=True):
+        """A Shape, as returned by Reader(lazy=True), that only decodes the
+        shape type and the number of parts and points up front. It keeps the
+        offset of its record in the .shp file and the record's content (buf),
+        and decodes bbox, parts, partTypes, points (or coords), z and m each
+        on first access, exactly as Reader would, and keeps the result. So
+        skimming a file for shape types or bounding boxes costs little more
+        than reading it.
+
+        doubles(buf, pos, count, width) decodes values for the Reader's coords
+        mode, and measured tells whether the file has m values (see Reader)."""
+        self.offset = offset
+        self._geo = None
+        self._buf = buf
+        self._doubles = doubles
+        self._coordsMode = coords
+        self._measured = measured
+        self.shapeType = shapeType = unpack_from("<i", buf, 0)[0]
+        self._nParts = self._nPoints = 0
+        # Position of the part indexes, or of the points if there are none
+        self._pos = pos = 4
+        # Shape types with a bounding box, parts, and points respectively
+        if shapeType in (3, 5, 8, 13, 15, 18, 23, 25, 28, 31):
+            pos += 32
+        if shapeType in (3, 5, 13, 15, 23, 25, 31):
+            self._nParts = unpack_from("<i", buf, pos)[0]
+            pos += 4
+        if shapeType in (3, 5, 8, 13, 15, 23, 25, 31):
+            self._nPoints = unpack_from("<i", buf, pos)[0]
+            pos += 4
+        self._pos = pos
+
+    # Attributes decoded on first access
+    _lazyAttributes = ("bbox", "_parts", "partTypes", "_points", "_coords", "z", "m")
+
+    def __getattr__(self, name):
+        # Only called for attributes that haven't been set (yet); once the
+        # raw content is gone (see __getstate__) everything has been decoded
+        if name not in LazyShape._lazyAttributes or self._buf is None:
+            raise AttributeError(name)
+        self.__decode(name)
+        return object.__getattribute__(self, name)
+
+    def __getstate__(self):
+        # Decode everything, as the raw content may be a view of a mapping
+        for name in LazyShape._lazyAttributes:
+            getattr(self, name, None)
+        state = {"_buf": None, "_doubles": None, "_geo": None}
+        for name in Shape.__slots__ + LazyShape.__slots__:
+            if name not in state and hasattr(self, name):
+                state[name] = getattr(self, name)
+        return None, state
+
+    def __decode(self, name):
+        """Decodes the given attribute, if this shape type has it."""
+        buf, shapeType, pos = self._buf, self.shapeType, self._pos
+        nParts, nPoints = self._nParts, self._nPoints
+        if name == "bbox":
+            if shapeType in (3, 5, 8, 13, 15, 18, 23, 25, 28, 31):
+                self.bbox = Array('d', unpack_from("<4d", buf, 4))
+        elif name == "_parts":
+            if nParts:
+                self.parts = Array('i', unpack_from("<%si" % nParts, buf, pos))
+        elif name == "partTypes":
+            if shapeType == 31:
+                self.partTypes = Array('i', unpack_from("<%si" % nParts, buf, pos + nParts * 4))
+        elif name in ("_points", "_coords"):
+            self._points = []
+            self._coords = None
+            if shapeType in (1, 11, 21):
+                pos, nPoints = 4, 1
+            elif shapeType == 31:
+                pos += nParts * 8
+            else:
+                pos += nParts * 4
+            if nPoints:
+                if self._coordsMode:
+                    self._points = None
+                    self._coords = self._doubles(buf, pos, 2 * nPoints, 2)
+                else:
+                    xy = unpack_from("<%sd" % (2 * nPoints), buf, pos)
+                    self._points = [Array('d', xy[i:i + 2]) for i in range(0, 2 * nPoints, 2)]
+        elif name == "z":
+            if shapeType == 11:
+                self.z = unpack_from("<d", buf, 20)
+            elif shapeType in (13, 15, 18, 31):
+                pos = self.__valuesPos() + 16
+                if self._coordsMode:
+                    self.z = self._doubles(buf, pos, nPoints)
                 else:
-                    coordinates.append(tuple([tuple(p) for p in self.points[part:]]))
-                polys = []
-                poly = [coordinates[0]]
-                for coord in coordinates[1:]:
-                    if signed_area(coord) < 0:
-                        polys.append(poly)
-                        poly = [coord]
-                    else:
-                        poly.append(coord)
-                polys.append(poly)
-                if len(polys) == 1:
-                    return dict(type='Polygon', coordinates=polys[0])
-                elif len(polys) > 1:
-                    return dict(type='MultiPolygon', coordinates=polys)
+                    self.z = Array('d', unpack_from("<%sd" % nPoints, buf, pos))
+        elif name == "m":
+            if shapeType in (11, 21):
+                self.m = unpack_from("<d", buf, 28 if shapeType == 11 else 20)
+            elif shapeType in (13, 15, 18, 23, 25, 28, 31) and self._measured:
+                pos = self.__valuesPos() + 16
+                if shapeType in (13, 15, 18, 31):
+                    pos += 16 + nPoints * 8
+                if self._coordsMode:
+                    self.m = self._doubles(buf, pos, nPoints)
+                else:
+                    # Measure values less than -10e38 are nodata values according to the spec
+                    self.m = [m if m > -10e38 else None
+                              for m in unpack_from("<%sd" % nPoints, buf, pos)]
+
+    def __valuesPos(self):
+        """Position of the block of z (or else m) extremes and values."""
+        partArrays = 2 if self.shapeType == 31 else 1
+        return self._pos + self._nParts * 4 * partArrays + self._nPoints * 16
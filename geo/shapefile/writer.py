@@ -1,14 +1,331 @@
 from struct import pack, error
 import os
+import sys
 import time
 import tempfile
 
-from geo.shapefile import ShapefileException
+from geo.shapefile import ShapefileException, Array
 from geo.shapefile.six import b
 from geo.shapefile.types import NULL, POLYLINE, POLYGON
 from geo.shapefile.shape import Shape
 
 
+def _getFileObj(f):
+    """Safety handler to verify file-like objects"""
+    if not f:
+        raise ShapefileException("No file-like object available.")
+    elif hasattr(f, "write"):
+        return f
+    else:
+        pth = os.path.split(f)[0]
+        if pth and not os.path.exists(pth):
+            os.makedirs(pth)
+        return open(f, "wb")
+
+def _bbox(shapes):
+    x = []
+    y = []
+    for s in shapes:
+        px, py = list(zip(*s.points))[:2]
+        x.extend(px)
+        y.extend(py)
+    return [min(x), min(y), max(x), max(y)]
+
+def _zbox(shapes):
+    z = []
+    for s in shapes:
+        try:
+            for p in s.points:
+                z.append(p[2])
+        except IndexError:
+            pass
+    if not z:
+        z.append(0)
+    return [min(z), max(z)]
+
+def _mbox(shapes):
+    m = [0]
+    for s in shapes:
+        try:
+            for p in s.points:
+                m.append(p[3])
+        except IndexError:
+            pass
+    return [min(m), max(m)]
+
+def _values(points, i):
+    """Lists the i-th value of each of points, up to the first point that
+    hasn't got one (as _zbox and _mbox take them)."""
+    try:
+        return [p[i] for p in points]
+    except IndexError:
+        values = []
+        for p in points:
+            if len(p) <= i:
+                break
+            values.append(p[i])
+        return values
+
+def _extents():
+    """Starts a running [min x, min y, max x, max y, min z, max z, min m,
+    max m] over the points of the shapes written, for the file headers."""
+    inf = float("inf")
+    return [inf, inf, -inf, -inf, inf, -inf, 0, 0]
+
+def _addExtents(extents, xs, ys, zs, ms):
+    """Widens extents to take in the given x, y, z and m values."""
+    if xs:
+        extents[0] = min(extents[0], min(xs))
+        extents[1] = min(extents[1], min(ys))
+        extents[2] = max(extents[2], max(xs))
+        extents[3] = max(extents[3], max(ys))
+    if zs:
+        extents[4] = min(extents[4], min(zs))
+        extents[5] = max(extents[5], max(zs))
+    if ms:
+        extents[6] = min(extents[6], min(ms))
+        extents[7] = max(extents[7], max(ms))
+
+def _extentBoxes(extents):
+    """The bbox, zbox and mbox of running extents, as the Writer methods of
+    the same names would give them."""
+    bbox = extents[0:4] if extents[0] <= extents[2] else [0, 0, 0, 0]
+    zbox = extents[4:6] if extents[4] <= extents[5] else [0, 0]
+    return bbox, zbox, extents[6:8]
+
+def _shapefileHeader(fileLength, shapeType, bbox, zbox, mbox):
+    """Encodes the 100 byte header shared by shp and shx files, where
+    fileLength is the length of the file in 16-bit words."""
+    # File code, Unused bytes, File length
+    header = [pack(">7i", 9994, 0, 0, 0, 0, 0, fileLength)]
+    # Version, Shape type
+    header.append(pack("<2i", 1000, shapeType))
+    # The shapefile's bounding box (lower left, upper right)
+    if shapeType != 0:
+        try:
+            header.append(pack("<4d", *bbox))
+        except error:
+            raise ShapefileException("Failed to write shapefile bounding box. Floats required.")
+    else:
+        header.append(pack("<4d", 0, 0, 0, 0))
+    # Elevation, Measure
+    try:
+        header.append(pack("<4d", zbox[0], zbox[1], mbox[0], mbox[1]))
+    except error:
+        raise ShapefileException(
+            "Failed to write shapefile elevation and measure values. Floats required.")
+    return b('').join(header)
+
+def _doubles(values):
+    """Packs a sequence of numbers as little-endian doubles."""
+    values = Array('d', values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+def _ints(values):
+    """Packs a sequence of integers as little-endian 32-bit ints."""
+    values = Array('i', values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+def _shpRecord(s, shapeType, recNum, extents=None):
+    """Encodes the content of shp record number recNum (everything after the
+    record number and content length) for the shape s. Part indexes and
+    coordinates are each packed in one go, rather than value by value. The
+    shape's points are added to extents (see _extents()), if given."""
+    # Shape Type
+    if shapeType != 31:
+        s.shapeType = shapeType
+    shapeType = s.shapeType
+    # Write a single point, with its Z and M values if any
+    if shapeType in (1, 11, 21):
+        point = s.points[0]
+        values = [point[0], point[1]]
+        if shapeType == 11:
+            if hasattr(s, "z"):
+                if not s.z:
+                    s.z = (0,)
+                values.append(s.z[0])
+            else:
+                if len(point) < 3:
+                    point.append(0)
+                values.append(point[2])
+        if shapeType in (11, 21):
+            if hasattr(s, "m"):
+                if not s.m:
+                    s.m = (0,)
+                values.append(s.m[0])
+            else:
+                if len(point) < 4:
+                    point.append(0)
+                values.append(point[3])
+        if extents is not None:
+            if len(s.points) == 1:
+                # the same as _addExtents, without the overhead for one point
+                x, y = point[0], point[1]
+                if x < extents[0]:
+                    extents[0] = x
+                if y < extents[1]:
+                    extents[1] = y
+                if x > extents[2]:
+                    extents[2] = x
+                if y > extents[3]:
+                    extents[3] = y
+                if len(point) > 2:
+                    if point[2] < extents[4]:
+                        extents[4] = point[2]
+                    if point[2] > extents[5]:
+                        extents[5] = point[2]
+                if len(point) > 3:
+                    if point[3] < extents[6]:
+                        extents[6] = point[3]
+                    if point[3] > extents[7]:
+                        extents[7] = point[3]
+            else:
+                _addExtents(extents, *(list(zip(*s.points)) + [(), ()])[:4])
+        try:
+            return pack("<i%dd" % len(values), shapeType, *values)
+        except error:
+            raise ShapefileException("Failed to write point for record %s. Expected floats." % recNum)
+    content = [pack("<i", shapeType)]
+    # The points' x, y, z and m values, each as one sequence
+    columns = []
+    if shapeType in (3, 5, 8, 13, 15, 18, 23, 25, 28, 31):
+        coords = None
+        if getattr(s, "_points", None) is None:
+            coords = getattr(s, "_coords", None)
+        if coords is None:
+            columns = list(zip(*s.points))
+            try:
+                xs, ys = Array('d', columns[0]), Array('d', columns[1])
+            except TypeError:
+                raise ShapefileException("Failed to write points for record %s. Expected floats." % recNum)
+            coords = Array('d', [0]) * (2 * len(xs))
+            coords[0::2], coords[1::2] = xs, ys
+        else:
+            if getattr(coords, "ndim", 1) == 2:
+                coords = coords.ravel().tolist()
+            coords = Array('d', coords)
+            xs, ys = coords[0::2], coords[1::2]
+        bbox = [min(xs), min(ys), max(xs), max(ys)]
+        if extents is not None:
+            # z and m values only come with points, and count up to the first
+            # point without one
+            zs = columns[2] if len(columns) > 2 else columns and _values(s.points, 2)
+            ms = columns[3] if len(columns) > 3 else columns and _values(s.points, 3)
+            _addExtents(extents, bbox[0::2], bbox[1::2], zs, ms)
+        # Bounding box, Number of parts, Number of points
+        if shapeType in (3, 5, 13, 15, 23, 25, 31):
+            content.append(pack("<4d2i", bbox[0], bbox[1], bbox[2], bbox[3],
+                                len(s.parts), len(coords) // 2))
+            # Part indexes, and part types for Multipatch (31)
+            parts = list(s.parts)
+            if shapeType == 31:
+                parts.extend(s.partTypes)
+            content.append(_ints(parts))
+            content.append(_doubles(coords))
+        elif shapeType == 8:
+            content.append(pack("<4di", bbox[0], bbox[1], bbox[2], bbox[3], len(coords) // 2))
+            content.append(_doubles(coords))
+        else:
+            # as before, MultiPointZ and MultiPointM records hold no x, y values
+            content.append(pack("<4d", *bbox))
+    # Write z extremes and values
+    if shapeType in (13, 15, 18, 31):
+        try:
+            if hasattr(s, "z"):
+                content.append(pack("<2d", *_zbox([s])))
+                content.append(_doubles(s.z))
+            else:
+                z = columns[2] if len(columns) > 2 else [p[2] for p in s.points]
+                content.append(pack("<2d", min(z or [0]), max(z or [0])))
+                content.append(_doubles(z))
+        except (TypeError, error):
+            raise ShapefileException("Failed to write elevation values for record %s. Expected floats." % recNum)
+    # Write m extremes and values
+    if shapeType in (13, 15, 18, 23, 25, 28, 31):
+        try:
+            m = columns[3] if len(columns) > 3 else [p[3] for p in s.points]
+            if hasattr(s, "m"):
+                content.append(_doubles(s.m))
+            else:
+                content.append(pack("<2d", min(min(m or [0]), 0), max(max(m or [0]), 0)))
+            content.append(_doubles(m))
+        except (TypeError, error):
+            raise ShapefileException("Failed to write measure values for record %s. Expected floats" % recNum)
+    return b('').join(content)
+
+def _dbfHeader(fields, numRecs):
+    """Encodes the dbf header and field descriptors for numRecs records."""
+    version = 3
+    year, month, day = time.localtime()[:3]
+    year -= 1900
+    numFields = len(fields)
+    headerLength = numFields * 32 + 33
+    recordLength = sum([int(field[2]) for field in fields]) + 1
+    header = [pack('<BBBBLHH20x', version, year, month, day, numRecs,
+                   headerLength, recordLength)]
+    # Field descriptors
+    for field in fields:
+        name, fieldType, size, decimal = field
+        name = b(name)
+        name = name.replace(b(' '), b('_'))
+        name = name.ljust(11).replace(b(' '), b('\x00'))
+        fieldType = b(fieldType)
+        size = int(size)
+        header.append(pack('<11sc4xBB14x', name, fieldType, size, decimal))
+    # Terminator
+    header.append(b('\r'))
+    return b('').join(header)
+
+def _dbfRecord(fields, record):
+    """Encodes a dbf record, deletion flag included."""
+    values = [b(' ')]
+    for (fieldName, fieldType, size, dec), value in zip(fields, record):
+        fieldType = fieldType.upper()
+        size = int(size)
+        if fieldType == "N":
+            value = str(value).rjust(size)
+        elif fieldType == 'L':
+            value = str(value)[0].upper()
+        else:
+            value = str(value)[:size].ljust(size)
+        assert len(value) == size
+        values.append(b(value))
+    return b('').join(values)
+
+def _dbfColumn(field, values):
+    """Formats a whole column of values (a list or NumPy array) for a dbf
+    field, by the same rules as _dbfRecord."""
+    name, fieldType, size, dec = field
+    fieldType = fieldType.upper()
+    size = int(size)
+    if hasattr(values, "tolist"):
+        values = values.tolist()
+    if fieldType == "N":
+        cells = [str(value).rjust(size) for value in values]
+    elif fieldType == 'L':
+        cells = [str(value)[0].upper() for value in values]
+    else:
+        cells = [str(value)[:size].ljust(size) for value in values]
+    assert not cells or min(map(len, cells)) == max(map(len, cells)) == size
+    return cells
+
+def _dbfRecords(fields, columns):
+    """Encodes the dbf records, deletion flags included, for all the rows of
+    columns (one per field) as a single block."""
+    cells = [_dbfColumn(field, column) for field, column in zip(fields, columns)]
+    return b(''.join(map(''.join, zip([' '] * len(cells[0]), *cells))))
+
+def _stripDeletionFlag(fields):
+    """Removes the deletion flag placeholder (as read by Reader) from fields."""
+    for field in fields:
+        if field[0].startswith("Deletion"):
+            fields.remove(field)
+
+
 class Writer(object):
     """Provides write support for ESRI Shapefiles."""
 
@@ -25,125 +342,26 @@ class Writer(object):
         self._lengths = []
         # Use deletion flags in dbf? Default is false (0).
         self.deletionFlag = 0
+        # Header bbox, zbox and mbox, as of the last time shp records were written
+        self._extentBoxes = None
 
     def __getFileObj(self, f):
         """Safety handler to verify file-like objects"""
-        if not f:
-            raise ShapefileException("No file-like object available.")
-        elif hasattr(f, "write"):
-            return f
-        else:
-            pth = os.path.split(f)[0]
-            if pth and not os.path.exists(pth):
-                os.makedirs(pth)
-            return open(f, "wb")
-
-    def __shpFileLength(self):
-        """Calculates the file length of the shp file."""
-        # Start with header length
-        size = 100
-        # Calculate size of all shapes
-        for s in self._shapes:
-            # Add in record header and shape type fields
-            size += 12
-            # nParts and nPoints do not apply to all shapes
-            # if self.shapeType not in (0,1):
-            #       nParts = len(s.parts)
-            #       nPoints = len(s.points)
-            if hasattr(s, 'parts'):
-                nParts = len(s.parts)
-            if hasattr(s, 'points'):
-                nPoints = len(s.points)
-            # All shape types capable of having a bounding box
-            if self.shapeType in (3, 5, 8, 13, 15, 18, 23, 25, 28, 31):
-                size += 32
-            # Shape types with parts
-            if self.shapeType in (3, 5, 13, 15, 23, 25, 31):
-                # Parts count
-                size += 4
-                # Parts index array
-                size += nParts * 4
-            # Shape types with points
-            if self.shapeType in (3, 5, 8, 13, 15, 23, 25, 31):
-                # Points count
-                size += 4
-                # Points array
-                size += 16 * nPoints
-            # Calc size of part types for Multipatch (31)
-            if self.shapeType == 31:
-                size += nParts * 4
-            # Calc z extremes and values
-            if self.shapeType in (13, 15, 18, 31):
-                # z extremes
-                size += 16
-                # z array
-                size += 8 * nPoints
-            # Calc m extremes and values
-            if self.shapeType in (23, 25, 31):
-                # m extremes
-                size += 16
-                # m array
-                size += 8 * nPoints
-            # Calc a single point
-            if self.shapeType in (1, 11, 21):
-                size += 16
-            # Calc a single Z value
-            if self.shapeType == 11:
-                size += 8
-            # Calc a single M value
-            if self.shapeType in (11, 21):
-                size += 8
-        # Calculate size as 16-bit words
-        size //= 2
-        return size
-
-    def __bbox(self, shapes, shapeTypes=[]):
-        x = []
-        y = []
-        for s in shapes:
-            shapeType = self.shapeType
-            if shapeTypes:
-                shapeType = shapeTypes[shapes.index(s)]
-            px, py = list(zip(*s.points))[:2]
-            x.extend(px)
-            y.extend(py)
-        return [min(x), min(y), max(x), max(y)]
-
-    def __zbox(self, shapes, shapeTypes=[]):
-        z = []
-        for s in shapes:
-            try:
-                for p in s.points:
-                    z.append(p[2])
-            except IndexError:
-                pass
-        if not z:
-            z.append(0)
-        return [min(z), max(z)]
-
-    def __mbox(self, shapes, shapeTypes=[]):
-        m = [0]
-        for s in shapes:
-            try:
-                for p in s.points:
-                    m.append(p[3])
-            except IndexError:
-                pass
-        return [min(m), max(m)]
+        return _getFileObj(f)
 
     def bbox(self):
         """Returns the current bounding box for the shapefile which is
         the lower-left and upper-right corners. It does not contain the
         elevation or measure extremes."""
-        return self.__bbox(self._shapes)
+        return _bbox(self._shapes)
 
     def zbox(self):
         """Returns the current z extremes for the shapefile."""
-        return self.__zbox(self._shapes)
+        return _zbox(self._shapes)
 
     def mbox(self):
         """Returns the current m extremes for the shapefile."""
-        return self.__mbox(self._shapes)
+        return _mbox(self._shapes)
 
     def __shapefileHeader(self, fileObj, headerType='shp'):
         """Writes the specified header type to the specified file-like object.
@@ -151,216 +369,100 @@ class Writer(object):
         method to read or write them is warranted."""
         f = self.__getFileObj(fileObj)
         f.seek(0)
-        # File code, Unused bytes
-        f.write(pack(">6i", 9994, 0, 0, 0, 0, 0))
         # File length (Bytes / 2 = 16-bit words)
         if headerType == 'shp':
-            f.write(pack(">i", self.__shpFileLength()))
+            fileLength = self._shpLength // 2
         elif headerType == 'shx':
-            f.write(pack('>i', ((100 + (len(self._shapes) * 8)) // 2)))
-        # Version, Shape type
-        f.write(pack("<2i", 1000, self.shapeType))
-        # The shapefile's bounding box (lower left, upper right)
-        if self.shapeType != 0:
-            try:
-                f.write(pack("<4d", *self.bbox()))
-            except error:
-                raise ShapefileException("Failed to write shapefile bounding box. Floats required.")
+            fileLength = (100 + (len(self._shapes) * 8)) // 2
+        if self._extentBoxes:
+            bbox, zbox, mbox = self._extentBoxes
         else:
-            f.write(pack("<4d", 0, 0, 0, 0))
-        # Elevation
-        z = self.zbox()
-        # Measure
-        m = self.mbox()
-        try:
-            f.write(pack("<4d", z[0], z[1], m[0], m[1]))
-        except error:
-            raise ShapefileException(
-                "Failed to write shapefile elevation and measure values. Floats required.")
+            bbox, zbox, mbox = self.bbox() if self.shapeType != 0 else None, self.zbox(), self.mbox()
+        f.write(_shapefileHeader(fileLength, self.shapeType, bbox, zbox, mbox))
 
     def __dbfHeader(self):
         """Writes the dbf header and field descriptors."""
         f = self.__getFileObj(self.dbf)
         f.seek(0)
-        version = 3
-        year, month, day = time.localtime()[:3]
-        year -= 1900
-        # Remove deletion flag placeholder from fields
-        for field in self.fields:
-            if field[0].startswith("Deletion"):
-                self.fields.remove(field)
-        numRecs = len(self.records)
-        numFields = len(self.fields)
-        headerLength = numFields * 32 + 33
-        recordLength = sum([int(field[2]) for field in self.fields]) + 1
-        header = pack('<BBBBLHH20x', version, year, month, day, numRecs,
-                      headerLength, recordLength)
-        f.write(header)
-        # Field descriptors
-        for field in self.fields:
-            name, fieldType, size, decimal = field
-            name = b(name)
-            name = name.replace(b(' '), b('_'))
-            name = name.ljust(11).replace(b(' '), b('\x00'))
-            fieldType = b(fieldType)
-            size = int(size)
-            fld = pack('<11sc4xBB14x', name, fieldType, size, decimal)
-            f.write(fld)
-        # Terminator
-        f.write(b('\r'))
-
-    def __shpRecords(self):
-        """Write the shp records"""
+        _stripDeletionFlag(self.fields)
+        f.write(_dbfHeader(self.fields, len(self.records)))
+
+    def __shpRecords(self, bufferSize=1 << 20):
+        """Write the shp records, gathering them into writes of about
+        bufferSize bytes, and note the file length and extents for the
+        headers."""
         f = self.__getFileObj(self.shp)
         f.seek(100)
-        recNum = 1
-        for s in self._shapes:
-            self._offsets.append(f.tell())
-            # Record number, Content length place holder
-            f.write(pack(">2i", recNum, 0))
-            recNum += 1
-            start = f.tell()
-            # Shape Type
-            if self.shapeType != 31:
-                s.shapeType = self.shapeType
-            f.write(pack("<i", s.shapeType))
-            # All shape types capable of having a bounding box
-            if s.shapeType in (3, 5, 8, 13, 15, 18, 23, 25, 28, 31):
-                try:
-                    f.write(pack("<4d", *self.__bbox([s])))
-                except error:
-                    raise ShapefileException("Falied to write bounding box for record %s. Expected floats." % recNum)
-            # Shape types with parts
-            if s.shapeType in (3, 5, 13, 15, 23, 25, 31):
-                # Number of parts
-                f.write(pack("<i", len(s.parts)))
-            # Shape types with multiple points per record
-            if s.shapeType in (3, 5, 8, 13, 15, 23, 25, 31):
-                # Number of points
-                f.write(pack("<i", len(s.points)))
-            # Write part indexes
-            if s.shapeType in (3, 5, 13, 15, 23, 25, 31):
-                for p in s.parts:
-                    f.write(pack("<i", p))
-            # Part types for Multipatch (31)
-            if s.shapeType == 31:
-                for pt in s.partTypes:
-                    f.write(pack("<i", pt))
-            # Write points for multiple-point records
-            if s.shapeType in (3, 5, 8, 13, 15, 23, 25, 31):
-                try:
-                    [f.write(pack("<2d", *p[:2])) for p in s.points]
-                except error:
-                    raise ShapefileException("Failed to write points for record %s. Expected floats." % recNum)
-            # Write z extremes and values
-            if s.shapeType in (13, 15, 18, 31):
-                try:
-                    f.write(pack("<2d", *self.__zbox([s])))
-                except error:
-                    raise ShapefileException("Failed to write elevation extremes for record %s. Expected floats." % recNum)
-                try:
-                    if hasattr(s, "z"):
-                        f.write(pack("<%sd" % len(s.z), *s.z))
-                    else:
-                        [f.write(pack("<d", p[2])) for p in s.points]
-                except error:
-                    raise ShapefileException("Failed to write elevation values for record %s. Expected floats." % recNum)
-            # Write m extremes and values
-            if s.shapeType in (13, 15, 18, 23, 25, 28, 31):
-                try:
-                    if hasattr(s, "m"):
-                        f.write(pack("<%sd" % len(s.m), *s.m))
-                    else:
-                        f.write(pack("<2d", *self.__mbox([s])))
-                except error:
-                    raise ShapefileException("Failed to write measure extremes for record %s. Expected floats" % recNum)
-                try:
-                    [f.write(pack("<d", p[3])) for p in s.points]
-                except error:
-                    raise ShapefileException("Failed to write measure values for record %s. Expected floats" % recNum)
-            # Write a single point
-            if s.shapeType in (1, 11, 21):
-                try:
-                    f.write(pack("<2d", s.points[0][0], s.points[0][1]))
-                except error:
-                    raise ShapefileException("Failed to write point for record %s. Expected floats." % recNum)
-            # Write a single Z value
-            if s.shapeType == 11:
-                if hasattr(s, "z"):
-                    try:
-                        if not s.z:
-                            s.z = (0,)
-                        f.write(pack("<d", s.z[0]))
-                    except error:
-                        raise ShapefileException("Failed to write elevation value for record %s. Expected floats." % recNum)
-                else:
-                    try:
-                        if len(s.points[0]) < 3:
-                            s.points[0].append(0)
-                        f.write(pack("<d", s.points[0][2]))
-                    except error:
-                        raise ShapefileException("Failed to write elevation value for record %s. Expected floats." % recNum)
-            # Write a single M value
-            if s.shapeType in (11, 21):
-                if hasattr(s, "m"):
-                    try:
-                        if not s.m:
-                            s.m = (0,)
-                        f.write(pack("<1d", s.m[0]))
-                    except error:
-                        raise ShapefileException("Failed to write measure value for record %s. Expected floats." % recNum)
-                else:
-                    try:
-                        if len(s.points[0]) < 4:
-                            s.points[0].append(0)
-                        f.write(pack("<1d", s.points[0][3]))
-                    except error:
-                        raise ShapefileException("Failed to write measure value for record %s. Expected floats." % recNum)
-            # Finalize record length as 16-bit words
-            finish = f.tell()
-            length = (finish - start) // 2
+        self._offsets = []
+        self._lengths = []
+        offset = 100
+        buf = bytearray()
+        extents = _extents()
+        for recNum, s in enumerate(self._shapes, 1):
+            content = _shpRecord(s, self.shapeType, recNum, extents)
+            # Record number, Content length as 16-bit words
+            length = len(content) // 2
+            self._offsets.append(offset)
             self._lengths.append(length)
-            # start - 4 bytes is the content length field
-            f.seek(start - 4)
-            f.write(pack(">i", length))
-            f.seek(finish)
+            buf += pack(">2i", recNum, length)
+            buf += content
+            offset += 8 + len(content)
+            if len(buf) >= bufferSize:
+                f.write(buf)
+                del buf[:]
+        f.write(buf)
+        self._shpLength = offset
+        self._extentBoxes = _extentBoxes(extents)
 
     def __shxRecords(self):
-        """Writes the shx records."""
+        """Writes the shx records, from the offsets and lengths noted when
+        the shp records were written."""
+        if len(self._offsets) != len(self._shapes):
+            raise ShapefileException("The shx file is an index of the shp file; "
+                                     "save the shp file first (saveShp or save).")
         f = self.__getFileObj(self.shx)
         f.seek(100)
-        for i in range(len(self._shapes)):
-            f.write(pack(">i", self._offsets[i] // 2))
-            f.write(pack(">i", self._lengths[i]))
+        index = Array('i', [0]) * (2 * len(self._shapes))
+        index[0::2] = Array('i', [offset // 2 for offset in self._offsets])
+        index[1::2] = Array('i', self._lengths)
+        if sys.byteorder == 'little':
+            index.byteswap()
+        f.write(index.tobytes())
 
-    def __dbfRecords(self):
-        """Writes the dbf records."""
+    def __dbfRecords(self, chunkSize=4096):
+        """Writes the dbf records, encoding chunkSize of them at a time
+        column by column."""
         f = self.__getFileObj(self.dbf)
-        for record in self.records:
-            if not self.fields[0][0].startswith("Deletion"):
-                f.write(b(' '))  # deletion flag
-            for (fieldName, fieldType, size, dec), value in zip(self.fields, record):
-                fieldType = fieldType.upper()
-                size = int(size)
-                if fieldType.upper() == "N":
-                    value = str(value).rjust(size)
-                elif fieldType == 'L':
-                    value = str(value)[0].upper()
-                else:
-                    value = str(value)[:size].ljust(size)
-                assert len(value) == size
-                value = b(value)
-                f.write(value)
+        width = len(self.fields)
+        for start in range(0, len(self.records), chunkSize):
+            records = self.records[start:start + chunkSize]
+            if width and all(len(record) >= width for record in records):
+                f.write(_dbfRecords(self.fields, list(zip(*records))))
+            else:
+                # records missing some values (see record())
+                f.write(b('').join([_dbfRecord(self.fields, record) for record in records]))
+
+    def _appendShape(self, shape):
+        """Adds a shape to the shapefile; a hook for subclasses."""
+        self._shapes.append(shape)
+
+    def _appendRecord(self, record):
+        """Adds a dbf record to the shapefile; a hook for subclasses."""
+        self.records.append(record)
+
+    def _appendColumns(self, columns):
+        """Adds a dbf record per row of columns; a hook for subclasses."""
+        self.records.extend([list(record) for record in zip(*columns)])
 
     def null(self):
         """Creates a null shape."""
-        self._shapes.append(Shape(NULL))
+        self._appendShape(Shape(NULL))
 
     def point(self, x, y, z=0, m=0):
         """Creates a point shape."""
         pointShape = Shape(self.shapeType)
         pointShape.points.append([x, y, z, m])
-        self._shapes.append(pointShape)
+        self._appendShape(pointShape)
 
     def line(self, parts=[], shapeType=POLYLINE):
         """Creates a line shape. This method is just a convienience method
@@ -397,7 +499,7 @@ class Writer(object):
                 for part in parts:
                     partTypes.append(polyShape.shapeType)
             polyShape.partTypes = partTypes
-        self._shapes.append(polyShape)
+        self._appendShape(polyShape)
 
     def field(self, name, fieldType="C", size="50", decimal=0):
         """Adds a dbf field descriptor to the shapefile."""
@@ -427,7 +529,35 @@ class Writer(object):
                     else:
                         record.append(val)
         if record:
-            self.records.append(record)
+            self._appendRecord(record)
+
+    def columns(self, columns, names=None):
+        """Creates a dbf attribute record for each row of the given columns,
+        which may be lists or NumPy arrays: one column per field, in field
+        order, or one per field name in names, like Reader.columns() returns
+        them. When names are given, None values and any fields left out are
+        blank. Values are formatted a whole column at a time, by the same
+        rules as for record().
+
+            w.columns([names, populations], ['NAME', 'POP2005'])
+        """
+        fields = self.fields
+        if fields and fields[0][0].startswith("Deletion"):
+            fields = fields[1:]
+        columns = [column.tolist() if hasattr(column, "tolist") else column for column in columns]
+        numRecords = len(columns[0]) if columns else 0
+        if any(len(column) != numRecords for column in columns):
+            raise ShapefileException("Columns must all have the same length.")
+        if names is None:
+            columns = columns[:len(fields)]
+        else:
+            named = dict(zip(names, columns))
+            columns = [[("" if value is None else value) for value in named[field[0]]]
+                       if field[0] in named else [""] * numRecords for field in fields]
+        if len(columns) < len(fields):
+            raise ShapefileException("Expected a column for each of the %d fields." % len(fields))
+        if numRecords:
+            self._appendColumns(columns)
 
     def shape(self, i):
         return self._shapes[i]
@@ -443,11 +573,14 @@ class Writer(object):
         if not self.shapeType:
             self.shapeType = self._shapes[0].shapeType
         self.shp = self.__getFileObj(target)
-        self.__shapefileHeader(self.shp, headerType='shp')
+        # The records go first, so that the header can give their length
         self.__shpRecords()
+        self.__shapefileHeader(self.shp, headerType='shp')
+        self.shp.seek(0, os.SEEK_END)
 
     def saveShx(self, target):
-        """Save an shx file."""
+        """Save an shx file. The shp file must be saved first, as the shx
+        file indexes its records."""
         if not hasattr(target, "write"):
             target = os.path.splitext(target)[0] + '.shx'
         if not self.shapeType:
@@ -494,3 +627,138 @@ class Writer(object):
             self.dbf.close()
             if generated:
                 return target
+
+
+class StreamWriter(Writer):
+    """Writes each shape and record to the shp, shx and dbf files as soon as
+    it is added, rather than keeping everything in memory until save().
+    Only running totals are kept (counts, the current shp offset, and the
+    bounding box, elevation and measure extremes), and the headers are
+    patched with them by close(), so memory use stays the same however
+    large the output gets.
+
+        with StreamWriter("out", POINT) as w:
+            w.field("NAME")
+            w.point(1, 2)
+            w.record("first")
+
+    Either give a target path (the .shp, .shx and .dbf files are created
+    next to each other) or any of the shp, shx and dbf file-like objects,
+    which must be seekable and are left open by close(). All fields must be
+    added before the first record. Shapes and records are not kept, so
+    shapes() is always empty."""
+
+    def __init__(self, target=None, shapeType=None, shp=None, shx=None, dbf=None):
+        Writer.__init__(self, shapeType)
+        if target:
+            base = os.path.splitext(target)[0]
+            shp, shx, dbf = base + '.shp', base + '.shx', base + '.dbf'
+        if not (shp or shx or dbf):
+            raise ShapefileException("StreamWriter requires a target or file-like objects.")
+        self._opened = []
+        for attr, f in (("shp", shp), ("shx", shx), ("dbf", dbf)):
+            if f:
+                setattr(self, attr, _getFileObj(f))
+                if not hasattr(f, "write"):
+                    self._opened.append(getattr(self, attr))
+        # Space for the headers, which are written by close()
+        for f in (self.shp, self.shx):
+            if f:
+                f.seek(0)
+                f.write(b('\0') * 100)
+        self._numShapes = 0
+        self._numRecords = 0
+        self._dbfStarted = False
+        self._closed = False
+        # Running shp file length in bytes, and extremes over all points
+        self._shpLength = 100
+        self._extents = _extents()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def field(self, name, fieldType="C", size="50", decimal=0):
+        """Adds a dbf field descriptor to the shapefile."""
+        if self._dbfStarted:
+            raise ShapefileException("Fields must be added before the first record.")
+        Writer.field(self, name, fieldType, size, decimal)
+
+    def _appendShape(self, shape):
+        if not self.shapeType:
+            self.shapeType = shape.shapeType
+        self._numShapes += 1
+        content = _shpRecord(shape, self.shapeType, self._numShapes, self._extents)
+        length = len(content) // 2
+        if self.shp:
+            self.shp.write(pack(">2i", self._numShapes, length) + content)
+        if self.shx:
+            self.shx.write(pack(">2i", self._shpLength // 2, length))
+        self._shpLength += 8 + len(content)
+
+    def _appendRecord(self, record):
+        if not self._dbfStarted:
+            self.__startDbf()
+        self._numRecords += 1
+        if self.dbf:
+            self.dbf.write(_dbfRecord(self.fields, record))
+
+    def _appendColumns(self, columns, chunkSize=4096):
+        if not self._dbfStarted:
+            self.__startDbf()
+        numRecords = len(columns[0])
+        self._numRecords += numRecords
+        if self.dbf:
+            for start in range(0, numRecords, chunkSize):
+                self.dbf.write(_dbfRecords(self.fields, [column[start:start + chunkSize]
+                                                         for column in columns]))
+
+    def __startDbf(self):
+        """Writes the dbf header, with a record count to be patched by close()."""
+        _stripDeletionFlag(self.fields)
+        if self.dbf:
+            self.dbf.seek(0)
+            self.dbf.write(_dbfHeader(self.fields, 0))
+        self._dbfStarted = True
+
+    def bbox(self):
+        """Returns the bounding box of the shapes written so far."""
+        return _extentBoxes(self._extents)[0]
+
+    def zbox(self):
+        """Returns the z extremes of the shapes written so far."""
+        return _extentBoxes(self._extents)[1]
+
+    def mbox(self):
+        """Returns the m extremes of the shapes written so far."""
+        return _extentBoxes(self._extents)[2]
+
+    def save(self, *args, **kwargs):
+        raise ShapefileException("StreamWriter writes as it goes; call close() instead of save().")
+
+    def close(self):
+        """Writes the headers and closes the files opened by the writer."""
+        if self._closed:
+            return
+        self._closed = True
+        shapeType = self.shapeType or NULL
+        if self.shp:
+            self.shp.seek(0)
+            self.shp.write(_shapefileHeader(self._shpLength // 2, shapeType,
+                                            self.bbox(), self.zbox(), self.mbox()))
+            self.shp.seek(0, os.SEEK_END)
+        if self.shx:
+            self.shx.seek(0)
+            self.shx.write(_shapefileHeader((100 + 8 * self._numShapes) // 2, shapeType,
+                                            self.bbox(), self.zbox(), self.mbox()))
+            self.shx.seek(0, os.SEEK_END)
+        if self.dbf:
+            if not self._dbfStarted:
+                self.__startDbf()
+            self.dbf.seek(0)
+            self.dbf.write(_dbfHeader(self.fields, self._numRecords))
+            self.dbf.seek(0, os.SEEK_END)
+        for f in self._opened:
+            f.close()
@@ -1,4 +1,24 @@
-def polygon_contains(poly, x, y):
+from bisect import bisect_left, bisect_right
+
+_numpy = []
+
+
+def _import_numpy():
+    '''
+    Return NumPy, or None if it isn't installed. It's imported on first use,
+    so that importing this module (and testing points one at a time against
+    small or prepared rings) doesn't pay for it.
+    '''
+    if not _numpy:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy.append(numpy)
+    return _numpy[0]
+
+
+def polygon_contains_python(poly, x, y):
     '''
     poly = [(x, y), (x, y), ...]  # list of (lon, lat) tuples completely
                                   # describing the boundary of a polygon
@@ -26,3 +46,213 @@ def polygon_contains(poly, x, y):
         p1x, p1y = p2x, p2y
 
     return inside
+
+
+def polygon_contains_many_python(poly, xs, ys):
+    '''
+    Like polygon_contains(poly, x, y), but for each of the points
+    (xs[i], ys[i]); returns a list of booleans.
+    '''
+    return [polygon_contains_python(poly, x, y) for x, y in zip(xs, ys)]
+
+
+def _edges(poly):
+    # (x1, y1, x2, y2) arrays for the edges from each vertex to the next,
+    # wrapping around from the last vertex to the first
+    numpy = _import_numpy()
+    ring = numpy.asarray(poly, dtype=float)[:, :2]
+    x1, y1 = ring[:, 0], ring[:, 1]
+    return x1, y1, numpy.roll(x1, -1), numpy.roll(y1, -1)
+
+
+def _crossings(x1, y1, x2, y2, x, y):
+    # the same edge tests as polygon_contains_python, for all edges at once
+    # (and, if x and y are columns, for many points at once)
+    numpy = _import_numpy()
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        xinters = (y - y1) * (x2 - x1) / (y2 - y1) + x1
+    return ((y > numpy.minimum(y1, y2)) & (y <= numpy.maximum(y1, y2)) &
+            (x <= numpy.maximum(x1, x2)) & ((x1 == x2) | (x <= xinters)))
+
+
+def polygon_contains_numpy(poly, x, y):
+    '''
+    NumPy implementation of polygon_contains: poly may be a list of (x, y)
+    tuples or an (n, 2) array, and all edges are tested in one go.
+    '''
+    numpy = _import_numpy()
+    return bool(numpy.count_nonzero(_crossings(*(_edges(poly) + (x, y)))) % 2)
+
+
+def polygon_contains_many_numpy(poly, xs, ys, chunk_size=1 << 20):
+    '''
+    NumPy implementation of polygon_contains_many, testing every (point, edge)
+    pair at once, in chunks of at most chunk_size pairs; returns a boolean array.
+    '''
+    numpy = _import_numpy()
+    x1, y1, x2, y2 = _edges(poly)
+    xs = numpy.asarray(xs, dtype=float)
+    ys = numpy.asarray(ys, dtype=float)
+    inside = numpy.zeros(len(xs), dtype=bool)
+    step = max(1, chunk_size // len(x1))
+    for start in range(0, len(xs), step):
+        crossings = _crossings(x1, y1, x2, y2, xs[start:start + step, None], ys[start:start + step, None])
+        inside[start:start + step] = numpy.count_nonzero(crossings, axis=1) % 2 == 1
+    return inside
+
+
+class PreparedRing(object):
+    '''
+    PreparedRing(poly, slab_size=8)
+
+    A ring prepared for many polygon_contains() tests. The y-range of the ring
+    is cut into horizontal slabs (at every slab_size-th distinct vertex y), and
+    the edges are kept in a segment tree over the slabs: each edge is listed
+    in the few nodes whose slab ranges make up the slabs it spans, so that a
+    long edge is listed once high up the tree rather than in every one of its
+    slabs, and the edges take O(n log(n / slab_size)) space. A test then
+    finds the query's slab by bisection and only looks at the edges on its
+    path to the root (kept per slab), rather than at every edge of the ring,
+    with exactly the same results as polygon_contains. contains_many() does
+    the same for many points at once, with NumPy.
+
+    min_x, min_y, max_x, max_y = float  # bounding box of the ring
+    '''
+    def __init__(self, poly, slab_size=8):
+        points = [(p[0], p[1]) for p in poly]
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        self.min_x, self.max_x = min(xs), max(xs)
+        self.min_y, self.max_y = min(ys), max(ys)
+        distinct_ys = sorted(set(ys))
+        self.bounds = distinct_ys[::slab_size]
+        if self.bounds[-1] != distinct_ys[-1]:
+            self.bounds.append(distinct_ys[-1])
+        # node i has children 2i and 2i + 1, and slab k is leaf size + k;
+        # nodes without edges are None
+        size = 1
+        while size < len(self.bounds) - 1:
+            size *= 2
+        self.size = size
+        self.nodes = nodes = [None] * (2 * size)
+        p1x, p1y = points[-1]
+        for p2x, p2y in points:
+            # horizontal edges never count as crossings
+            if p1y != p2y:
+                low, high = min(p1y, p2y), max(p1y, p2y)
+                # the slabs (bounds[k], bounds[k + 1]] that overlap (low, high]
+                first = bisect_right(self.bounds, low) - 1 + size
+                end = bisect_left(self.bounds, high) + size
+                edge = (p1x, p1y, p2x, p2y, low, high, max(p1x, p2x))
+                while first < end:
+                    if first & 1:
+                        if nodes[first] is None:
+                            nodes[first] = []
+                        nodes[first].append(edge)
+                        first += 1
+                    if end & 1:
+                        end -= 1
+                        if nodes[end] is None:
+                            nodes[end] = []
+                        nodes[end].append(edge)
+                    first //= 2
+                    end //= 2
+            p1x, p1y = p2x, p2y
+        # for each slab, the edge lists on its path to the root
+        self.paths = []
+        for k in range(len(self.bounds) - 1):
+            node, path = size + k, []
+            while node:
+                if nodes[node] is not None:
+                    path.append(nodes[node])
+                node //= 2
+            self.paths.append(tuple(path))
+        self._arrays = None
+
+    def contains(self, x, y):
+        '''
+        Same as polygon_contains(poly, x, y) for the ring this was prepared from
+        '''
+        if x < self.min_x or x > self.max_x:
+            return False
+        k = bisect_left(self.bounds, y) - 1
+        if k < 0 or k >= len(self.paths):
+            return False
+        inside = False
+        for edges in self.paths[k]:
+            for p1x, p1y, p2x, p2y, low, high, max_x in edges:
+                if low < y <= high and x <= max_x:
+                    if p1x == p2x or x <= (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x:
+                        inside = not inside
+        return inside
+
+    def _edge_arrays(self):
+        # the slab bounds, and the edges of all nodes, node after node, as
+        # (x1, y1, x2, y2) rows, with the position of each node's first edge
+        # and its number of edges
+        numpy = _import_numpy()
+        if self._arrays is None:
+            counts = numpy.array([len(edges or ()) for edges in self.nodes], dtype=numpy.intp)
+            edges = numpy.array([edge[:4] for node in self.nodes for edge in node or ()],
+                                dtype=float).reshape(-1, 4)
+            starts = numpy.cumsum(counts) - counts
+            self._arrays = numpy.array(self.bounds, dtype=float), edges, starts, counts
+        return self._arrays
+
+    def contains_many(self, xs, ys, chunk_size=1 << 20):
+        '''
+        Like contains(x, y), but for each of the points (xs[i], ys[i]) in the
+        NumPy arrays xs and ys; returns a boolean array. All the points are
+        tested at once, each only against the edges on its slab's path to the
+        root, in chunks of about chunk_size (point, edge) pairs.
+        '''
+        numpy = _import_numpy()
+        xs = numpy.asarray(xs, dtype=float)
+        ys = numpy.asarray(ys, dtype=float)
+        inside = numpy.zeros(len(xs), dtype=bool)
+        bounds, edges, starts, counts = self._edge_arrays()
+        slabs = numpy.searchsorted(bounds, ys, 'left') - 1
+        candidates = numpy.nonzero((slabs >= 0) & (slabs < len(self.paths)) &
+                                   (self.min_x <= xs) & (xs <= self.max_x))[0]
+        if not len(candidates):
+            return inside
+        xs, ys = xs[candidates], ys[candidates]
+        # the nodes on each candidate's path, from its leaf up to the root,
+        # and how many edges they hold between them
+        nodes = (self.size + slabs[candidates])[:, None] >> numpy.arange(self.size.bit_length())
+        pairs = counts[nodes].sum(axis=1)
+        # chunk boundaries, by running total of (point, edge) pairs
+        totals = numpy.cumsum(pairs)
+        cuts = numpy.searchsorted(totals, numpy.arange(chunk_size, totals[-1], chunk_size), 'right')
+        cuts = [0] + sorted(set(cuts.tolist()) - set([0, len(candidates)])) + [len(candidates)]
+        for start, stop in zip(cuts, cuts[1:]):
+            chunk = nodes[start:stop].ravel()
+            repeats = counts[chunk]
+            # one (point, edge) pair for each edge of each node on the path
+            point = numpy.repeat(numpy.arange(stop - start), pairs[start:stop])
+            offsets = numpy.cumsum(repeats) - repeats
+            x1, y1, x2, y2 = edges[numpy.arange(len(point)) + numpy.repeat(starts[chunk] - offsets, repeats)].T
+            crossings = _crossings(x1, y1, x2, y2, xs[start:stop][point], ys[start:stop][point])
+            inside[candidates[start:stop]] = numpy.bincount(point[crossings], minlength=stop - start) % 2 == 1
+        return inside
+
+
+def polygon_contains(poly, x, y, numpy_from=512):
+    '''
+    polygon_contains_python(poly, x, y), or the NumPy version for rings of at
+    least numpy_from vertices (if NumPy is available): for a single point,
+    NumPy's overhead outweighs the gain on smaller rings.
+    '''
+    if len(poly) >= numpy_from and _import_numpy() is not None:
+        return polygon_contains_numpy(poly, x, y)
+    return polygon_contains_python(poly, x, y)
+
+
+def polygon_contains_many(poly, xs, ys):
+    '''
+    polygon_contains_many_numpy(poly, xs, ys) if NumPy is available, and
+    polygon_contains_many_python otherwise
+    '''
+    if _import_numpy() is None:
+        return polygon_contains_many_python(poly, xs, ys)
+    return polygon_contains_many_numpy(poly, xs, ys)
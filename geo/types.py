@@ -1,5 +1,11 @@
-from geo.spatial import polygon_contains
+from geo.spatial import PreparedRing, polygon_contains_many, _import_numpy
+from geo.rtree import RTree
+from array import array
+from collections import OrderedDict
 import json
+import math
+import numbers
+import re
 
 
 class GeoEncoder(json.JSONEncoder):
@@ -9,6 +15,87 @@ class GeoEncoder(json.JSONEncoder):
         return super(GeoEncoder, self).default(obj)
 
 
+# position formats by (number of values, precision), for _encode_coordinates
+_position_formats = {}
+
+# anything but JSON numbers in formatted positions, such as nan, inf,
+# True or a NumPy scalar's repr
+_not_numbers = re.compile(r'[^-+.0-9eE\[\], ]')
+
+def _encode_coordinates(coordinates, precision):
+    # JSON for a position, or a (nested) list of positions; each position is
+    # formatted with a single %-format, and a list of positions in one map(),
+    # unless a value comes out as something other than a JSON number
+    if hasattr(coordinates, 'tolist'):
+        coordinates = coordinates.tolist()
+    if not len(coordinates):
+        return '[]'
+    first = coordinates[0]
+    if not isinstance(first, (list, tuple)):
+        try:
+            text = _position_format(len(coordinates), precision) % tuple(coordinates)
+        except TypeError:
+            text = None
+        if text is None or _not_numbers.search(text):
+            text = '[' + ', '.join([_encode_number(value, precision) for value in coordinates]) + ']'
+        return text
+    if len(first) and not isinstance(first[0], (list, tuple)):
+        try:
+            text = '[' + ', '.join(map(_position_format(len(first), precision).__mod__,
+                                       map(tuple, coordinates))) + ']'
+            if not _not_numbers.search(text):
+                return text
+        except TypeError:
+            # positions of different lengths
+            pass
+    return '[' + ', '.join([_encode_coordinates(c, precision) for c in coordinates]) + ']'
+
+def _position_format(length, precision):
+    key = (length, precision)
+    if key not in _position_formats:
+        value = '%r' if precision is None else '%%.%df' % precision
+        _position_formats[key] = '[' + ', '.join([value] * length) + ']'
+    return _position_formats[key]
+
+def _encode_number(value, precision):
+    # a coordinate value the way json.dumps writes it (NaN, Infinity, ...),
+    # or to the given number of decimal places
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, numbers.Integral) and precision is None:
+        return int.__repr__(int(value))
+    if not isinstance(value, numbers.Real):
+        raise TypeError('Object of type %s is not JSON serializable' % type(value).__name__)
+    value = float(value)
+    if value != value:
+        return 'NaN'
+    elif value == float('inf'):
+        return 'Infinity'
+    elif value == -float('inf'):
+        return '-Infinity'
+    return float.__repr__(value) if precision is None else '%.*f' % (precision, value)
+
+def _encode_geojson(obj, precision, encode):
+    # JSON for a GeoJSON object (a dict, or anything with __geo_interface__),
+    # the same as encode() gives, except that coordinates are formatted
+    # directly (and to the given number of decimal places, if not None)
+    obj = getattr(obj, '__geo_interface__', obj)
+    if not isinstance(obj, dict):
+        return encode(obj)
+    items = []
+    for key, value in obj.items():
+        if key == 'coordinates':
+            value = _encode_coordinates(value, precision)
+        elif key == 'geometry':
+            value = _encode_geojson(value, precision, encode)
+        elif key == 'geometries' and isinstance(value, (list, tuple)):
+            value = '[' + ', '.join([_encode_geojson(geometry, precision, encode) for geometry in value]) + ']'
+        else:
+            value = encode(value)
+        items.append(encode(key) + ': ' + value)
+    return '{' + ', '.join(items) + '}'
+
+
 class BoundingBox(object):
     '''
     BoundingBox(minimum_longitude, minimum_latitude, maximum_longitude, maximum_latitude)
@@ -21,10 +108,7 @@ class BoundingBox(object):
     # longitude is the easting coordinate, along the x-axis
     # latitude is the northing coordinate, along the y-axis
     '''
-    min_x = None
-    min_y = None
-    max_x = None
-    max_y = None
+    __slots__ = ('min_x', 'min_y', 'max_x', 'max_y')
 
     def __init__(self, min_x, min_y, max_x, max_y):
         self.min_x = min_x
@@ -32,6 +116,10 @@ class BoundingBox(object):
         self.max_x = max_x
         self.max_y = max_y
 
+    def __getstate__(self):
+        # (no __dict__, and every pickle protocol takes this form of state)
+        return None, dict((name, getattr(self, name)) for name in self.__slots__)
+
     def contains(self, x, y):
         '''
         Check whether the given point lies within this box's boundaries
@@ -63,30 +151,111 @@ class Feature(object):
     A Feature has a geometry that is usually a Polygon or MultiPolygon
 
     bbox = BoundingBox object (if blank, computed from given polygons)
+
+    The rings of the geometry are prepared for containment tests (see
+    geo.spatial.PreparedRing) on the first call to contains(), and again
+    whenever `geometry` is reassigned.
     '''
+    __slots__ = ('_geometry', '_prepared', 'properties', 'id', 'bbox')
+
     def __init__(self, geometry, properties, id=None, bbox=None):
         self.geometry = geometry
         self.properties = properties
         self.id = id
         self.bbox = bbox
 
+    @property
+    def geometry(self):
+        return self._geometry
+
+    @geometry.setter
+    def geometry(self, geometry):
+        self._geometry = geometry
+        self._prepared = None
+
+    def __getstate__(self):
+        # the prepared rings are left out; they're rebuilt on first use
+        state = dict((name, getattr(self, name)) for name in self.__slots__)
+        state['_prepared'] = None
+        return None, state
+
+    def prepared(self):
+        '''
+        List a (shell, holes) pair for each polygon in this feature, where
+        shell is a PreparedRing for the outer ring and holes is a list of
+        PreparedRings for the rest
+        '''
+        if self._prepared is None:
+            self._prepared = [(PreparedRing(linear_rings[0]), [PreparedRing(hole) for hole in linear_rings[1:]])
+                              for linear_rings in self.polygons()]
+        return self._prepared
+
     def contains(self, x, y):
         # first, do coarse-grained check (by bounding box)
         if self.bbox is None or self.bbox.contains(x, y):
-            # then the exact check (could be quite slow!)
-            # TODO: check for holes (by looking at all linear rings in a polygon
-            if self.geometry['type'] == 'MultiPolygon':
-                for linear_rings in self.geometry['coordinates']:
-                    if polygon_contains(linear_rings[0], x, y):
-                        return True
-            elif self.geometry['type'] == 'Polygon':
-                linear_rings = self.geometry['coordinates']
-                if polygon_contains(linear_rings[0], x, y):
+            # then the exact check, which only looks at the edges near y:
+            # the point must be inside a polygon's shell but outside all of
+            # its holes (each hole rejects most points by its bounding box)
+            for shell, holes in self.prepared():
+                if shell.contains(x, y) and not any(hole.contains(x, y) for hole in holes):
                     return True
-            else:
-                return False
         return False
 
+    def contains_many(self, xs, ys, prepared_from=32):
+        '''
+        Like contains(), but for the points (xs[i], ys[i]) in the NumPy
+        arrays xs and ys, returning an array of booleans. Rings of at least
+        prepared_from vertices are tested with their PreparedRing, which
+        only looks at the edges near each point; smaller ones test every
+        edge against every point, which is quicker for them.
+        '''
+        def ring_contains_many(ring, prepared, xs, ys):
+            if len(ring) >= prepared_from:
+                return prepared.contains_many(xs, ys)
+            return numpy.asarray(polygon_contains_many(ring, xs, ys), dtype=bool)
+
+        numpy = _import_numpy()
+        inside = numpy.zeros(len(xs), dtype=bool)
+        candidates = numpy.ones(len(xs), dtype=bool)
+        if self.bbox is not None:
+            candidates = ((self.bbox.min_x <= xs) & (xs <= self.bbox.max_x) &
+                          (self.bbox.min_y <= ys) & (ys <= self.bbox.max_y))
+        if candidates.any():
+            xs, ys = xs[candidates], ys[candidates]
+            found = numpy.zeros(len(xs), dtype=bool)
+            for linear_rings, (shell, holes) in zip(self.polygons(), self.prepared()):
+                in_shell = ring_contains_many(linear_rings[0], shell, xs, ys)
+                for hole, prepared_hole in zip(linear_rings[1:], holes):
+                    # only the points inside the shell (and the hole's bounding box) need checking
+                    maybe = numpy.nonzero(in_shell &
+                                          (prepared_hole.min_x <= xs) & (xs <= prepared_hole.max_x) &
+                                          (prepared_hole.min_y <= ys) & (ys <= prepared_hole.max_y))[0]
+                    if len(maybe):
+                        in_hole = ring_contains_many(hole, prepared_hole, xs[maybe], ys[maybe])
+                        in_shell[maybe[in_hole]] = False
+                found |= in_shell
+            inside[candidates] = found
+        return inside
+
+    def polygons(self):
+        '''
+        List the linear rings (the outer ring, then any holes) of each polygon
+        in this feature's geometry (empty for geometries other than Polygon
+        and MultiPolygon)
+        '''
+        if self.geometry['type'] == 'MultiPolygon':
+            return list(self.geometry['coordinates'])
+        elif self.geometry['type'] == 'Polygon':
+            return [self.geometry['coordinates']]
+        return []
+
+    def outer_rings(self):
+        '''
+        List the outer ring of each polygon in this feature's geometry
+        (empty for geometries other than Polygon and MultiPolygon)
+        '''
+        return [linear_rings[0] for linear_rings in self.polygons()]
+
     @property
     def __geo_interface__(self):
         # GeoJSON Feature format
@@ -98,37 +267,516 @@ class Feature(object):
         return geojson
 
 
+class FeatureList(list):
+    '''
+    A list of features that tells the FeatureCollection it belongs to
+    whenever it is modified, so that the collection's indexes and caches
+    never go stale. Appended features are passed along, so that the id and
+    property indexes can be updated in place instead of rebuilt.
+    '''
+    def __init__(self, features, collection):
+        super(FeatureList, self).__init__(features)
+        self._collection = collection
+
+    def append(self, feature):
+        super(FeatureList, self).append(feature)
+        self._collection._features_changed(appended=[feature])
+
+    def extend(self, features):
+        features = list(features)
+        super(FeatureList, self).extend(features)
+        self._collection._features_changed(appended=features)
+
+    def insert(self, i, feature):
+        super(FeatureList, self).insert(i, feature)
+        self._collection._features_changed()
+
+    def remove(self, feature):
+        super(FeatureList, self).remove(feature)
+        self._collection._features_changed()
+
+    def pop(self, *args):
+        feature = super(FeatureList, self).pop(*args)
+        self._collection._features_changed()
+        return feature
+
+    def sort(self, *args, **kwargs):
+        super(FeatureList, self).sort(*args, **kwargs)
+        self._collection._features_changed()
+
+    def reverse(self):
+        super(FeatureList, self).reverse()
+        self._collection._features_changed()
+
+    def clear(self):
+        super(FeatureList, self).clear()
+        self._collection._features_changed()
+
+    def __setitem__(self, i, feature):
+        super(FeatureList, self).__setitem__(i, feature)
+        self._collection._features_changed()
+
+    def __delitem__(self, i):
+        super(FeatureList, self).__delitem__(i)
+        self._collection._features_changed()
+
+    def __iadd__(self, features):
+        self.extend(features)
+        return self
+
+    def __imul__(self, n):
+        super(FeatureList, self).__imul__(n)
+        self._collection._features_changed()
+        return self
+
+    def __reduce__(self):
+        # pickled (and copied) as a plain list: the collection wraps it again
+        return (list, (list(self),))
+
+
 class FeatureCollection(object):
     '''
     Helper class to make geolocating lat-lon pairs easier.
+
+    Lookups go through an R-tree over the features' bounding boxes (built on
+    the first lookup, and again whenever `features` is reassigned), so only
+    the features whose bounding box contains the point are tested exactly.
+
+    Features are also indexed by id, for collection[id], and optionally by
+    the values of chosen properties (see index_property()).
+
+    `features` is a copy of the list it is given (or assigned): a FeatureList
+    that keeps those indexes up to date as it is modified. Changes to the
+    original list afterwards are not seen by the collection.
     '''
     def __init__(self, features):
+        self._ids = None
+        self._property_indexes = {}
+        self._grid_resolution = None
+        self._cache = None
+        self._hits = None
+        self.features = features
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_features'] = list(self._features)
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        features = state.pop('_features')
+        self.__dict__.update(state)
+        # (rewrapped, which also drops the indexes and caches)
         self.features = features
 
+    @property
+    def features(self):
+        return self._features
+
+    @features.setter
+    def features(self, features):
+        self._features = FeatureList(features, self)
+        self._features_changed()
+
+    def _features_changed(self, appended=None):
+        # drop everything derived from the features; it's rebuilt lazily,
+        # except that appended features are just added to the id and
+        # property indexes (they come last, so can't change who comes first)
+        if appended is not None and self._ids is not None:
+            for feature in appended:
+                self._ids.setdefault(feature.id, feature)
+        else:
+            self._ids = None
+        for key, index in self._property_indexes.items():
+            if appended is not None and index is not None:
+                self._add_to_property_index(index, key, appended)
+            else:
+                self._property_indexes[key] = None
+        self._index = None
+        self._grid = None
+        if self._cache is not None:
+            self._cache.clear()
+        if self._hits is not None:
+            self._reset_hits()
+
+    def index_property(self, key):
+        '''
+        Index the features by the value of their `key` property (e.g. 'ISO2'),
+        for features_with(key, value)
+        '''
+        self._property_indexes.setdefault(key, None)
+
+    def _add_to_property_index(self, index, key, features):
+        for feature in features:
+            if feature.properties and key in feature.properties:
+                try:
+                    index.setdefault(feature.properties[key], []).append(feature)
+                except TypeError:
+                    # unhashable values (lists, dicts) can't be looked up anyway
+                    pass
+
+    def features_with(self, key, value):
+        '''
+        List the features whose `key` property equals value, in collection
+        order. This is a dictionary lookup if the property has been indexed
+        with index_property(key), and a scan over all features otherwise.
+        '''
+        if key not in self._property_indexes:
+            return [feature for feature in self.features
+                    if feature.properties and feature.properties.get(key) == value]
+        index = self._property_indexes[key]
+        if index is None:
+            index = self._property_indexes[key] = {}
+            self._add_to_property_index(index, key, self.features)
+        return list(index.get(value, ()))
+
+    def enable_cache(self, maxsize=100000, precision=4):
+        '''
+        Memoize first_feature_containing() in a least-recently-used cache of
+        at most maxsize entries, keyed by the coordinates rounded to the given
+        number of decimal places (4 is about 11 meters of latitude). Each
+        lookup returns the feature containing the rounded coordinates, so
+        nearby points that round to the same key always get the same answer.
+        The cache is cleared whenever `features` changes.
+        '''
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self._cache = OrderedDict()
+        self._cache_maxsize = maxsize
+        self._cache_precision = precision
+        self._cache_hits = self._cache_misses = self._cache_evictions = 0
+
+    def cache_info(self):
+        '''
+        Report the cache's hits, misses, evictions, and current and maximum size
+        '''
+        if self._cache is None:
+            return None
+        return dict(hits=self._cache_hits, misses=self._cache_misses, evictions=self._cache_evictions,
+                    size=len(self._cache), maxsize=self._cache_maxsize)
+
+    def _build_index(self):
+        # self._boxes lists each feature's (min_x, min_y, max_x, max_y), or
+        # None for features that can't contain points (and are left out of
+        # the index entirely)
+        self._boxes = []
+        for feature in self.features:
+            outer_rings = feature.outer_rings()
+            if outer_rings:
+                bbox = feature.bbox or BoundingBox.from_polygons(*outer_rings)
+                self._boxes.append((bbox.min_x, bbox.min_y, bbox.max_x, bbox.max_y))
+            else:
+                self._boxes.append(None)
+        ids = [i for i, box in enumerate(self._boxes) if box is not None]
+        self._index = RTree([self._boxes[i] for i in ids], ids)
+        return self._index
+
+    def build_grid(self, resolution):
+        '''
+        Precompute a uniform grid of resolution x resolution cells (in the
+        features' coordinate units, e.g., 0.1 degrees) for
+        first_feature_containing() to use. Each cell is classified as
+        entirely inside a feature (answered with no polygon test at all),
+        entirely outside all features (not stored), or on a boundary, in
+        which case only the short list of features it overlaps is tested.
+        The grid is rebuilt automatically when `features` is reassigned.
+        '''
+        self._grid_resolution = resolution
+        self._grid = self._build_grid()
+
+    def _grid_cell(self, x, y):
+        origin_x, origin_y = self._grid_origin
+        return (int(math.floor((x - origin_x) / self._grid_resolution)),
+                int(math.floor((y - origin_y) / self._grid_resolution)))
+
+    def _build_grid(self):
+        # self._grid maps a cell to a list of (feature index, interior) pairs,
+        # in feature order, where interior means that the whole cell is inside
+        # that feature; the list ends at the first interior entry, since
+        # first_feature_containing never needs to look any further
+        if self._index is None:
+            self._build_index()
+        boxes = [box for box in self._boxes if box is not None]
+        self._grid_origin = (min(box[0] for box in boxes), min(box[1] for box in boxes)) if boxes else (0, 0)
+        grid = {}
+        for i, (feature, box) in enumerate(zip(self.features, self._boxes)):
+            if box is None:
+                continue
+            # the cells that any of the feature's edges passes through
+            # (conservatively, every cell within the edge's bounding box)
+            boundary = set()
+            for linear_rings in feature.polygons():
+                for ring in linear_rings:
+                    x1, y1 = self._grid_cell(*ring[-1][:2])
+                    for point in ring:
+                        x2, y2 = self._grid_cell(*point[:2])
+                        for cell_x in range(min(x1, x2), max(x1, x2) + 1):
+                            for cell_y in range(min(y1, y2), max(y1, y2) + 1):
+                                boundary.add((cell_x, cell_y))
+                        x1, y1 = x2, y2
+            # cells along the rim of the feature's bounding box are treated as
+            # boundary cells too, since contains() also checks the bbox; any
+            # other cell is either entirely inside or entirely outside the
+            # feature, which its center point decides
+            min_x, min_y = self._grid_cell(box[0], box[1])
+            max_x, max_y = self._grid_cell(box[2], box[3])
+            for cell_x in range(min_x, max_x + 1):
+                for cell_y in range(min_y, max_y + 1):
+                    cell = (cell_x, cell_y)
+                    entries = grid.setdefault(cell, [])
+                    if entries and entries[-1][1]:
+                        # already answered by an earlier feature
+                        continue
+                    if cell in boundary or cell_x in (min_x, max_x) or cell_y in (min_y, max_y):
+                        entries.append((i, False))
+                    else:
+                        center_x = self._grid_origin[0] + (cell_x + 0.5) * self._grid_resolution
+                        center_y = self._grid_origin[1] + (cell_y + 0.5) * self._grid_resolution
+                        if feature.contains(center_x, center_y):
+                            entries.append((i, True))
+        return dict((cell, entries) for cell, entries in grid.items() if entries)
+
     @property
     def __geo_interface__(self):
         return dict(type='FeatureCollection', features=self.features)
 
+    def iterencode(self, precision=None):
+        '''
+        Yield this collection as GeoJSON text, one feature at a time. This is
+        the same text as json.dumps(collection, cls=GeoEncoder), except that
+        coordinates are formatted straight from each geometry (without going
+        through json's encoder), with precision decimal places if given.
+        '''
+        encode = GeoEncoder().encode
+        yield '{"type": "FeatureCollection", "features": ['
+        for i, feature in enumerate(self.features):
+            yield (', ' if i else '') + _encode_geojson(feature, precision, encode)
+        yield ']}'
+
+    def dump(self, fp, precision=None, buffer_size=1 << 16):
+        '''
+        Write this collection as GeoJSON (see iterencode()) to the text file
+        fp (e.g. an open file, or socket.makefile('w')), about buffer_size
+        characters at a time, so only a few features are in memory at once.
+        '''
+        chunk = []
+        size = 0
+        for text in self.iterencode(precision):
+            chunk.append(text)
+            size += len(text)
+            if size >= buffer_size:
+                fp.write(''.join(chunk))
+                chunk = []
+                size = 0
+        fp.write(''.join(chunk))
+
     def features_containing(self, lon, lat):
         # lon = x = easting
         # lat = y = northing
         # TODO: reorder areas into the most popular first so that we find them quicker
-        for feature in self.features:
+        index = self._index or self._build_index()
+        for i in sorted(index.search(lon, lat, lon, lat)):
+            feature = self.features[i]
             if feature.contains(lon, lat):
                 yield feature
 
     def first_feature_containing(self, lon, lat):
+        if self._cache is None:
+            return self._first_feature_containing(lon, lat)
+        key = (round(lon, self._cache_precision), round(lat, self._cache_precision))
+        try:
+            feature = self._cache.pop(key)
+            self._cache_hits += 1
+        except KeyError:
+            self._cache_misses += 1
+            feature = self._first_feature_containing(*key)
+            if len(self._cache) >= self._cache_maxsize:
+                self._cache.popitem(last=False)
+                self._cache_evictions += 1
+        # (re)insert the key as the most recently used
+        self._cache[key] = feature
+        return feature
+
+    def _first_feature_containing(self, lon, lat):
+        if self._grid_resolution is not None:
+            if self._grid is None:
+                self._grid = self._build_grid()
+            for i, interior in self._grid.get(self._grid_cell(lon, lat), ()):
+                feature = self.features[i]
+                if interior or feature.contains(lon, lat):
+                    return feature
+            return None
+        if self._hits is not None:
+            return self._adaptive_first_feature_containing(lon, lat)
         for feature in self.features_containing(lon, lat):
             return feature
 
+    def enable_adaptive(self, reorder_interval=1000):
+        '''
+        Count how often each feature is the answer to first_feature_containing()
+        and, every reorder_interval lookups, re-rank the features so that the
+        most popular candidates are tested first.
+
+        The answer stays the same as in collection order even when features
+        overlap: before a hit is returned, every earlier candidate (in
+        collection order) that might also contain the point is tested too.
+        Which features might is worked out once per pair of features, from a
+        coarse grid over the overlap of their bounding boxes, so that e.g.
+        neighboring countries only need re-checking near their shared border.
+        '''
+        self._reorder_interval = reorder_interval
+        self._reset_hits()
+
+    def _reset_hits(self):
+        self._hits = [0] * len(self.features)
+        self._rank = list(range(len(self.features)))
+        self._lookups = 0
+        self._conflicts = {}
+
+    def _adaptive_first_feature_containing(self, lon, lat):
+        self._lookups += 1
+        if self._lookups % self._reorder_interval == 0:
+            order = sorted(range(len(self._hits)), key=lambda i: (-self._hits[i], i))
+            for rank, i in enumerate(order):
+                self._rank[i] = rank
+        index = self._index or self._build_index()
+        candidates = sorted(index.search(lon, lat, lon, lat))
+        tested = set()
+        for i in sorted(candidates, key=self._rank.__getitem__):
+            if self.features[i].contains(lon, lat):
+                # an earlier feature may contain this point too
+                for j in candidates:
+                    if j >= i:
+                        break
+                    if j not in tested and self._may_overlap(j, i, lon, lat) and \
+                            self.features[j].contains(lon, lat):
+                        i = j
+                        break
+                self._hits[i] += 1
+                return self.features[i]
+            tested.add(i)
+        return None
+
+    def _may_overlap(self, j, i, lon, lat, size=16):
+        # Check whether the point (lon, lat) lies in a cell of a size x size
+        # grid, laid over the overlap of features j's and i's bounding boxes,
+        # that both features cover some part of (no cell = no common point)
+        if (j, i) not in self._conflicts:
+            box_j, box_i = self._boxes[j], self._boxes[i]
+            box = (max(box_j[0], box_i[0]), max(box_j[1], box_i[1]),
+                   min(box_j[2], box_i[2]), min(box_j[3], box_i[3]))
+            cells = None
+            if box[2] > box[0] and box[3] > box[1]:
+                cells = self._covered_cells(j, box, size) & self._covered_cells(i, box, size)
+            self._conflicts[(j, i)] = (box, cells)
+        box, cells = self._conflicts[(j, i)]
+        if cells is None:
+            # a degenerate overlap; always check
+            return True
+        return self._box_cell(box, size, lon, lat) in cells
+
+    def _box_cell(self, box, size, x, y):
+        return (min(max(int((x - box[0]) * size / (box[2] - box[0])), 0), size - 1),
+                min(max(int((y - box[1]) * size / (box[3] - box[1])), 0), size - 1))
+
+    def _edge_cells(self, box, size, p1, p2):
+        # the cells of the grid over box that the edge p1-p2 passes through,
+        # column by column (give or take a cell, for rounding)
+        x1, y1 = self._box_cell(box, size, p1[0], p1[1])
+        x2, y2 = self._box_cell(box, size, p2[0], p2[1])
+        if x1 == x2:
+            columns = [(x1, min(y1, y2), max(y1, y2))]
+        else:
+            width = (box[2] - box[0]) / size
+            slope = (p2[1] - p1[1]) / (p2[0] - p1[0])
+            columns = []
+            for cell_x in range(min(x1, x2), max(x1, x2) + 1):
+                left = max(min(p1[0], p2[0]), box[0] + cell_x * width)
+                right = min(max(p1[0], p2[0]), box[0] + (cell_x + 1) * width)
+                row1 = self._box_cell(box, size, left, p1[1] + (left - p1[0]) * slope)[1]
+                row2 = self._box_cell(box, size, right, p1[1] + (right - p1[0]) * slope)[1]
+                columns.append((cell_x, min(row1, row2), max(row1, row2)))
+        for cell_x, low, high in columns:
+            for cell_y in range(max(low - 1, 0), min(high + 1, size - 1) + 1):
+                yield cell_x, cell_y
+
+    def _covered_cells(self, i, box, size):
+        # the cells of the grid over box that contain some point of feature i:
+        # those that its edges pass through, and those whose center is inside
+        feature = self.features[i]
+        cells = set()
+        for linear_rings in feature.polygons():
+            for ring in linear_rings:
+                p1 = ring[-1]
+                for p2 in ring:
+                    if min(p1[0], p2[0]) <= box[2] and max(p1[0], p2[0]) >= box[0] and \
+                            min(p1[1], p2[1]) <= box[3] and max(p1[1], p2[1]) >= box[1]:
+                        cells.update(self._edge_cells(box, size, p1, p2))
+                    p1 = p2
+        for cell_x in range(size):
+            for cell_y in range(size):
+                if (cell_x, cell_y) not in cells:
+                    center_x = box[0] + (cell_x + 0.5) * (box[2] - box[0]) / size
+                    center_y = box[1] + (cell_y + 0.5) * (box[3] - box[1]) / size
+                    if feature.contains(center_x, center_y):
+                        cells.add((cell_x, cell_y))
+        return cells
+
+    def locate_many(self, lons, lats):
+        '''
+        Geolocate many points at once: for each point (lons[i], lats[i]),
+        find the index (into self.features) of the first feature containing
+        it, or -1 if there is none. Returns a NumPy int array when NumPy is
+        installed, otherwise an array('i').
+
+        With NumPy, the work is done feature by feature, in order: each
+        feature only tests the points that fall in its bounding box and
+        haven't been located yet, all at once with Feature.contains_many.
+        '''
+        index = self._index or self._build_index()
+        numpy = _import_numpy()
+        if numpy is None:
+            located = array('i')
+            for lon, lat in zip(lons, lats):
+                for i in sorted(index.search(lon, lat, lon, lat)):
+                    if self.features[i].contains(lon, lat):
+                        located.append(i)
+                        break
+                else:
+                    located.append(-1)
+            return located
+        lons = numpy.asarray(lons, dtype=float)
+        lats = numpy.asarray(lats, dtype=float)
+        located = numpy.full(len(lons), -1, dtype=int)
+        if not len(lons):
+            return located
+        extent = (lons.min(), lats.min(), lons.max(), lats.max())
+        for i in sorted(index.search(*extent)):
+            min_x, min_y, max_x, max_y = self._boxes[i]
+            candidates = numpy.nonzero((located == -1) &
+                                       (min_x <= lons) & (lons <= max_x) &
+                                       (min_y <= lats) & (lats <= max_y))[0]
+            if len(candidates):
+                inside = self.features[i].contains_many(lons[candidates], lats[candidates])
+                located[candidates[inside]] = i
+        return located
+
     def __getitem__(self, feature_id):
         '''
         Access features in this collection by id. E.g.,
 
             us_states['Ohio']
 
+        Ids are indexed when first looked up, so changing the id of a feature
+        that is already in the collection isn't noticed (reassign or modify
+        `features` to reindex).
         '''
-        for feature in self.features:
-            if feature.id == feature_id:
-                return feature
-        raise IndexError(feature_id)
+        if self._ids is None:
+            # the first feature with a given id wins, as with a scan
+            self._ids = {}
+            for feature in self.features:
+                self._ids.setdefault(feature.id, feature)
+        try:
+            return self._ids[feature_id]
+        except KeyError:
+            raise IndexError(feature_id)
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+import geo.shapefile as geo_shapefile
+from geo.shapefile import ShapefileException
+from geo.shapefile.reader import Reader
+from geo.shapefile.writer import Writer
+
+
+def write_squares(path, count=50):
+    # count unit squares along the x axis, with an ID and a NAME field
+    writer = Writer()
+    writer.field('ID', 'N', 10)
+    writer.field('NAME', 'C', 10)
+    for i in range(count):
+        writer.poly(parts=[[[i, 0], [i, 1], [i + 1, 1], [i + 1, 0], [i, 0]]])
+        writer.record(i, 'n%d' % i)
+    writer.save(path)
+    return path
+
+
+def test_parallel_shape_records_dotted_name(tmp_path):
+    # (the extension is stripped only once)
+    path = write_squares(str(tmp_path / 'my.poly.shp'))
+    reader = Reader(path)
+    expected = [(i, shape.points, record) for i, (shape, record)
+                in enumerate(zip(reader.shapes(), reader.records()))]
+    results = reader.parallelShapeRecords(processes=2, chunksize=7)
+    assert [(i, shape.points, record) for i, shape, record in results] == expected
+
+
+def test_parallel_shape_records_open_error(tmp_path):
+    # a worker that can't open the shapefile raises in the caller rather
+    # than hanging the pool
+    path = write_squares(str(tmp_path / 'squares'))
+    reader = Reader(path)
+    os.remove(path + '.shp')
+    with pytest.raises(ShapefileException):
+        list(reader.parallelShapeRecords(processes=2))
+
+
+def as_list(column):
+    return column.tolist() if hasattr(column, 'tolist') else list(column)
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_columns_repeated_name(tmp_path, monkeypatch, use_numpy):
+    if not use_numpy:
+        # as if NumPy weren't installed
+        monkeypatch.setattr('geo.shapefile._numpy', [None])
+    elif geo_shapefile._importNumpy() is None:
+        pytest.skip('NumPy is not installed')
+    reader = Reader(write_squares(str(tmp_path / 'squares'), count=5))
+    ids, names, again = reader.columns(['ID', 'NAME', 'ID'])
+    assert as_list(ids) == as_list(again) == [0, 1, 2, 3, 4]
+    assert as_list(names) == ['n0', 'n1', 'n2', 'n3', 'n4']
+    # each column is its own list or array
+    assert ids is not again
+
+
+def test_truncated_or_corrupt_spatial_index(tmp_path):
+    # a .rtx file that can't be read is ignored, like a stale one
+    path = write_squares(str(tmp_path / 'squares'))
+    box = [10.5, 0.25, 14.5, 0.75]
+    expected = [shape.points for shape in Reader(path).shapes(bbox=box)]
+    assert len(expected) == 5
+    Reader(path).buildIndex()
+    with open(path + '.rtx', 'rb') as f:
+        data = f.read()
+    corrupt = bytearray(data)
+    corrupt[24:28] = b'\x01\x00\x00\x00'  # a node size of 1
+    for contents in [data[:n] for n in (0, 10, 20, 27, 40, len(data) - 4)] + [bytes(corrupt), data]:
+        with open(path + '.rtx', 'wb') as f:
+            f.write(contents)
+        assert [shape.points for shape in Reader(path).shapes(bbox=box)] == expected
+
+
+def test_build_index_node_size(tmp_path):
+    reader = Reader(write_squares(str(tmp_path / 'squares')))
+    with pytest.raises(ValueError):
+        reader.buildIndex(save=False, node_size=1)
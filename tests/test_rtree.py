@@ -0,0 +1,56 @@
+import io
+import random
+
+import pytest
+
+from geo.rtree import RTree
+
+
+def random_boxes(count, seed=0):
+    rng = random.Random(seed)
+    boxes = []
+    for _ in range(count):
+        x, y = rng.uniform(0, 100), rng.uniform(0, 100)
+        boxes.append((x, y, x + rng.uniform(0, 5), y + rng.uniform(0, 5)))
+    return boxes
+
+
+def brute_force(boxes, min_x, min_y, max_x, max_y):
+    return sorted(i for i, box in enumerate(boxes)
+                  if box[0] <= max_x and min_x <= box[2] and box[1] <= max_y and min_y <= box[3])
+
+
+def test_search_matches_brute_force():
+    boxes = random_boxes(500)
+    tree = RTree(boxes, node_size=4)
+    for query in random_boxes(100, seed=1):
+        assert sorted(tree.search(*query)) == brute_force(boxes, *query)
+
+
+@pytest.mark.parametrize('node_size', [1, 0, -3])
+def test_node_size_too_small(node_size):
+    with pytest.raises(ValueError):
+        RTree(random_boxes(10), node_size=node_size)
+
+
+def test_dump_and_load():
+    boxes = random_boxes(300)
+    fp = io.BytesIO()
+    RTree(boxes).dump(fp)
+    fp.seek(0)
+    tree = RTree.load(fp)
+    for query in random_boxes(50, seed=2):
+        assert sorted(tree.search(*query)) == brute_force(boxes, *query)
+
+
+def test_load_truncated_or_corrupt():
+    fp = io.BytesIO()
+    RTree(random_boxes(300)).dump(fp)
+    data = fp.getvalue()
+    for length in (0, 5, 8, 20, len(data) - 4, len(data) - 1):
+        with pytest.raises(ValueError):
+            RTree.load(io.BytesIO(data[:length]))
+    # a node size of 1 (which would never finish packing) or a negative count
+    for header in (b'\x10\x00\x00\x00\x01\x00\x00\x00', b'\xff\xff\xff\xff\x10\x00\x00\x00'):
+        with pytest.raises(ValueError):
+            RTree.load(io.BytesIO(header + data[8:]))
@@ -0,0 +1,98 @@
+import math
+
+import pytest
+
+from geo.shapefile import Array
+from geo.shapefile.shape import Shape
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+requires_numpy = pytest.mark.skipif(numpy is None, reason='NumPy is not installed')
+
+
+def ring(cx, cy, r, clockwise, n=8):
+    # closed n-gon; shells are clockwise, holes counter-clockwise
+    points = [(cx + r * math.cos(t * 2 * math.pi / n), cy + r * math.sin(t * 2 * math.pi / n)) for t in range(n)]
+    if clockwise:
+        points.reverse()
+    return tuple(points + [points[0]])
+
+
+def square(x0, y0, x1, y1, clockwise):
+    points = ((x0, y0), (x0, y1), (x1, y1), (x1, y0), (x0, y0))
+    return points if clockwise else points[::-1]
+
+
+def polygon(rings, storage='points'):
+    shape = Shape(5)
+    positions = [p for r in rings for p in r]
+    if storage == 'points':
+        shape.points = [list(p) for p in positions]
+    elif storage == 'coords':
+        shape.coords = Array('d', [c for p in positions for c in p])
+    else:
+        shape.coords = numpy.array(positions, dtype=float)
+    parts, start = [], 0
+    for r in rings:
+        parts.append(start)
+        start += len(r)
+    shape.parts = parts
+    return shape.__geo_interface__
+
+
+def test_holes_out_of_order():
+    # shell A, shell B, hole of A, hole of B, an island in A's hole, a lake on it
+    a, b = ring(0, 0, 10, True), ring(30, 0, 10, True)
+    hole_a, hole_b = ring(0, 0, 5, False), ring(30, 0, 5, False)
+    island, lake = ring(0, 0, 3, True), ring(0, 0, 1, False)
+    geometry = polygon([a, b, hole_a, hole_b, island, lake])
+    assert geometry['type'] == 'MultiPolygon'
+    assert geometry['coordinates'] == [[a, hole_a], [b, hole_b], [island, lake]]
+
+
+def test_hole_before_shell():
+    a, hole = ring(0, 0, 10, True), ring(0, 0, 5, False)
+    geometry = polygon([hole, a])
+    assert geometry['type'] == 'Polygon'
+    assert geometry['coordinates'] == [a, hole]
+
+
+def test_hole_outside_every_shell():
+    a, outside = ring(0, 0, 10, True), ring(50, 50, 1, False)
+    assert polygon([a, outside])['coordinates'] == [[a], [outside]]
+
+
+def test_no_clockwise_rings():
+    a, b = ring(0, 0, 1, False), ring(5, 0, 1, False)
+    assert polygon([a, b])['coordinates'] == [[a], [b]]
+
+
+def test_hole_touching_inner_shell():
+    # the hole's first vertex is on the inner shell's edge (x=2), where it
+    # can't tell which shell the hole is in
+    outer = square(0.0, 0.0, 10.0, 10.0, True)
+    inner = square(2.0, 2.0, 8.0, 8.0, True)
+    hole = ((2.0, 4.0), (4.0, 3.0), (4.0, 5.0), (2.0, 4.0))
+    assert polygon([outer, inner, hole])['coordinates'] == [[outer], [inner, hole]]
+
+
+def test_islands_with_lakes():
+    # enough shells for them to be looked up through an R-tree, with every
+    # lake listed after all the islands
+    centers = [(i % 10 * 10.0, i // 10 * 10.0) for i in range(50)]
+    islands = [ring(x, y, 4, True) for x, y in centers]
+    lakes = [ring(x, y, 2, False) for x, y in centers]
+    geometry = polygon(islands + lakes)
+    assert geometry['coordinates'] == [[island, lake] for island, lake in zip(islands, lakes)]
+
+
+@pytest.mark.parametrize('storage', ['points', 'coords', pytest.param('numpy', marks=requires_numpy)])
+def test_storage_agrees(storage):
+    # 1000 points in all, enough for ring areas and boxes to go through NumPy
+    # when the shape is held as coords
+    a, b = ring(0, 0, 10, True, 200), ring(30, 0, 10, True, 200)
+    rings = [ring(0, 0, 5, False, 200), a, ring(30, 0, 5, False, 200), b, ring(60, 0, 1, False, 196)]
+    assert polygon(rings, storage)['coordinates'] == [[a, rings[0]], [b, rings[2]], [rings[4]]]
@@ -0,0 +1,129 @@
+import math
+import random
+
+import pytest
+
+from geo.spatial import PreparedRing, polygon_contains, polygon_contains_python, polygon_contains_many_python
+
+try:
+    import numpy
+    from geo.spatial import polygon_contains_numpy, polygon_contains_many_numpy
+except ImportError:
+    numpy = None
+
+requires_numpy = pytest.mark.skipif(numpy is None, reason='NumPy is not installed')
+
+
+def random_rings(seed, count=40):
+    # star-shaped rings (simple polygons) and rings of random points (usually
+    # self-intersecting), some on an integer grid so that queries hit
+    # vertices and edges exactly, some closed (last vertex == first)
+    rng = random.Random(seed)
+    rings = []
+    for i in range(count):
+        n = rng.randint(3, 60)
+        if i % 2:
+            angles = sorted(rng.uniform(0, 6.283) for _ in range(n))
+            ring = [(5 + r * math.cos(a), 5 + r * math.sin(a))
+                    for a, r in ((a, rng.uniform(1, 5)) for a in angles)]
+        else:
+            ring = [(rng.uniform(0, 10), rng.uniform(0, 10)) for _ in range(n)]
+        if i % 4 < 2:
+            ring = [(float(round(x)), float(round(y))) for x, y in ring]
+        if i % 3 == 0:
+            ring.append(ring[0])
+        rings.append(ring)
+    return rings
+
+
+def query_points(ring, seed, count=200):
+    # random points, every vertex, the midpoint of every edge, and points
+    # level with every vertex (to hit horizontal edges and vertex rays)
+    rng = random.Random(seed)
+    points = [(rng.uniform(-1, 11), rng.uniform(-1, 11)) for _ in range(count)]
+    points += [(float(rng.randint(0, 10)), float(rng.randint(0, 10))) for _ in range(count)]
+    points += [(x, y) for x, y in ring]
+    points += [((x1 + x2) / 2, (y1 + y2) / 2) for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1])]
+    points += [(x + 0.5, y) for x, y in ring] + [(x - 0.5, y) for x, y in ring]
+    return points
+
+
+special_rings = [
+    # axis-aligned square: horizontal and vertical edges
+    [(0.0, 0.0), (4.0, 0.0), (4.0, 4.0), (0.0, 4.0)],
+    # the same, closed, and clockwise
+    [(0.0, 0.0), (0.0, 4.0), (4.0, 4.0), (4.0, 0.0), (0.0, 0.0)],
+    # repeated vertices and a collinear run
+    [(0.0, 0.0), (2.0, 0.0), (2.0, 0.0), (4.0, 0.0), (4.0, 4.0), (4.0, 4.0), (0.0, 4.0)],
+    # a comb: many vertices level with one another
+    [(0.0, 0.0), (6.0, 0.0), (6.0, 3.0), (5.0, 3.0), (5.0, 1.0), (4.0, 1.0), (4.0, 3.0),
+     (3.0, 3.0), (3.0, 1.0), (2.0, 1.0), (2.0, 3.0), (1.0, 3.0), (1.0, 1.0), (0.0, 1.0)],
+    # degenerate: all points on one line
+    [(0.0, 0.0), (1.0, 1.0), (2.0, 2.0)],
+]
+
+
+def all_cases():
+    for i, ring in enumerate(special_rings + random_rings(0)):
+        yield ring, query_points(ring, i)
+
+
+def test_prepared_ring_matches_python():
+    for ring, points in all_cases():
+        prepared = PreparedRing(ring)
+        for x, y in points:
+            assert prepared.contains(x, y) == polygon_contains_python(ring, x, y), (ring, x, y)
+
+
+def test_prepared_ring_small_slabs():
+    for ring, points in all_cases():
+        prepared = PreparedRing(ring, slab_size=1)
+        for x, y in points:
+            assert prepared.contains(x, y) == polygon_contains_python(ring, x, y), (ring, x, y)
+
+
+@requires_numpy
+def test_numpy_matches_python():
+    for ring, points in all_cases():
+        for x, y in points:
+            assert polygon_contains_numpy(ring, x, y) == polygon_contains_python(ring, x, y), (ring, x, y)
+            assert polygon_contains(ring, x, y) == polygon_contains_python(ring, x, y), (ring, x, y)
+
+
+@requires_numpy
+def test_numpy_many_matches_python():
+    for ring, points in all_cases():
+        xs = numpy.array([x for x, _ in points])
+        ys = numpy.array([y for _, y in points])
+        expected = polygon_contains_many_python(ring, xs, ys)
+        assert polygon_contains_many_numpy(ring, xs, ys).tolist() == expected
+        # and in chunks smaller than the number of (point, edge) pairs
+        assert polygon_contains_many_numpy(ring, xs, ys, chunk_size=7).tolist() == expected
+
+
+@requires_numpy
+def test_prepared_ring_contains_many():
+    for ring, points in all_cases():
+        xs = numpy.array([x for x, _ in points])
+        ys = numpy.array([y for _, y in points])
+        for slab_size in (1, 8):
+            prepared = PreparedRing(ring, slab_size)
+            expected = [prepared.contains(x, y) for x, y in points]
+            assert prepared.contains_many(xs, ys).tolist() == expected
+            # and in chunks of a few (point, edge) pairs
+            assert prepared.contains_many(xs, ys, chunk_size=5).tolist() == expected
+
+
+@requires_numpy
+def test_numpy_accepts_arrays():
+    ring = special_rings[0]
+    assert polygon_contains_numpy(numpy.array(ring), 1.0, 1.0)
+    assert not polygon_contains_numpy(numpy.array(ring), 5.0, 1.0)
+
+
+def test_large_ring_dispatch():
+    # polygon_contains switches to NumPy (if available) for large rings
+    n = 2000
+    ring = [(math.cos(t * 2 * math.pi / n), math.sin(t * 2 * math.pi / n)) for t in range(n)]
+    for x, y in [(0.0, 0.0), (0.5, 0.5), (0.99, 0.0), (1.5, 0.0), ring[10]]:
+        assert polygon_contains(ring, x, y) == polygon_contains_python(ring, x, y)
@@ -0,0 +1,154 @@
+import copy
+import math
+import pickle
+import random
+
+import pytest
+
+from geo.types import BoundingBox, Feature, FeatureCollection
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+requires_numpy = pytest.mark.skipif(numpy is None, reason='NumPy is not installed')
+
+
+def square(x, y=0, size=1):
+    return [(x, y), (x + size, y), (x + size, y + size), (x, y + size), (x, y)]
+
+
+def square_features(count=5):
+    return [Feature({'type': 'Polygon', 'coordinates': [square(i)]}, {'K': i % 2}, id='f%d' % i,
+                    bbox=BoundingBox(i, 0, i + 1, 1))
+            for i in range(count)]
+
+
+def test_feature_list_clear():
+    collection = FeatureCollection(square_features())
+    collection.index_property('K')
+    assert collection['f1'].id == 'f1'
+    assert collection.first_feature_containing(1.5, 0.5).id == 'f1'
+    assert len(collection.features_with('K', 1)) == 2
+    collection.features.clear()
+    with pytest.raises(IndexError):
+        collection['f1']
+    assert collection.first_feature_containing(1.5, 0.5) is None
+    assert collection.features_with('K', 1) == []
+
+
+@pytest.mark.parametrize('protocol', range(pickle.HIGHEST_PROTOCOL + 1))
+def test_feature_collection_pickle(protocol):
+    collection = FeatureCollection(square_features())
+    collection.index_property('K')
+    collection.enable_cache()
+    # build the indexes and cache before pickling
+    assert collection.first_feature_containing(2.5, 0.5).id == 'f2'
+    assert collection['f1'].id == 'f1'
+    copied = pickle.loads(pickle.dumps(collection, protocol))
+    assert [feature.id for feature in copied.features] == ['f0', 'f1', 'f2', 'f3', 'f4']
+    assert copied.features[1].geometry == collection.features[1].geometry
+    assert copied.features[1].bbox.max_x == 2
+    assert copied.first_feature_containing(3.5, 0.5).id == 'f3'
+    assert [feature.id for feature in copied.features_with('K', 1)] == ['f1', 'f3']
+    # the copy's feature list still keeps its indexes up to date
+    copied.features.append(Feature({'type': 'Polygon', 'coordinates': [square(9)]}, {'K': 1}, id='new'))
+    assert copied['new'].id == 'new'
+    assert copied.first_feature_containing(9.5, 0.5).id == 'new'
+
+
+def test_feature_collection_deepcopy():
+    collection = FeatureCollection(square_features())
+    assert collection['f0'].id == 'f0'
+    copied = copy.deepcopy(collection)
+    copied.features.pop()
+    assert len(collection.features) == 5
+    assert copied.first_feature_containing(4.5, 0.5) is None
+    assert collection.first_feature_containing(4.5, 0.5).id == 'f4'
+
+
+def test_enable_cache_maxsize():
+    collection = FeatureCollection(square_features())
+    with pytest.raises(ValueError):
+        collection.enable_cache(maxsize=0)
+    collection.enable_cache(maxsize=1)
+    assert collection.first_feature_containing(0.5, 0.5).id == 'f0'
+    assert collection.first_feature_containing(1.5, 0.5).id == 'f1'
+    assert collection.cache_info()['evictions'] == 1
+
+
+def wavy_ring(n, radius=1.0, lobes=12):
+    angles = [t * 2 * math.pi / n for t in range(n)]
+    return [(radius * (1 + 0.1 * math.sin(lobes * a)) * math.cos(a),
+             radius * (1 + 0.1 * math.sin(lobes * a)) * math.sin(a)) for a in angles]
+
+
+@requires_numpy
+@pytest.mark.parametrize('n', [12, 5000])
+def test_locate_many_matches_first_feature_containing(n):
+    # small rings test every edge, large ones go through their PreparedRing
+    geometry = {'type': 'Polygon', 'coordinates': [wavy_ring(n), wavy_ring(n, 0.3)[::-1]]}
+    collection = FeatureCollection([Feature(geometry, {}),
+                                    Feature({'type': 'Polygon', 'coordinates': [square(-2, -2, 4)]}, {})])
+    rng = random.Random(n)
+    lons = [rng.uniform(-2.5, 2.5) for _ in range(2000)]
+    lats = [rng.uniform(-2.5, 2.5) for _ in range(2000)]
+    # and the ring's own vertices
+    lons += [x for x, _ in geometry['coordinates'][0][::7]]
+    lats += [y for _, y in geometry['coordinates'][0][::7]]
+    expected = []
+    for lon, lat in zip(lons, lats):
+        feature = collection.first_feature_containing(lon, lat)
+        expected.append(-1 if feature is None else collection.features.index(feature))
+    assert collection.locate_many(lons, lats).tolist() == expected
+    assert set(expected) == set([-1, 0, 1])
+
+
+def lake_features():
+    # a country with a lake, holding an island (a second polygon), and an
+    # enclave that fills a second hole in the country
+    country = square(0, 0, 10)
+    lake = square(1, 1, 4)[::-1]
+    island = square(2, 2, 2)
+    enclave = square(6, 6, 3)
+    return [Feature({'type': 'MultiPolygon', 'coordinates': [[country, lake, enclave[::-1]], [island]]},
+                    {}, id='country'),
+            Feature({'type': 'Polygon', 'coordinates': [enclave]}, {}, id='enclave')]
+
+
+lake_points = [
+    ((0.5, 0.5), 'country'),
+    ((1.5, 1.5), None),        # in the lake
+    ((3.0, 3.0), 'country'),   # on the island
+    ((4.5, 4.5), None),        # in the lake, past the island
+    ((7.5, 7.5), 'enclave'),
+    ((9.5, 5.0), 'country'),
+    ((11.0, 5.0), None),
+]
+
+
+def test_holes_are_not_contained():
+    country, enclave = lake_features()
+    for (x, y), expected in lake_points:
+        assert country.contains(x, y) == (expected == 'country'), (x, y)
+        assert enclave.contains(x, y) == (expected == 'enclave'), (x, y)
+    collection = FeatureCollection(lake_features())
+    for (x, y), expected in lake_points:
+        feature = collection.first_feature_containing(x, y)
+        assert (feature and feature.id) == expected, (x, y)
+
+
+@requires_numpy
+@pytest.mark.parametrize('prepared_from', [3, 1000])
+def test_contains_many_holes(prepared_from):
+    # through the prepared rings and through every edge
+    xs = numpy.array([x for (x, _), _ in lake_points])
+    ys = numpy.array([y for (_, y), _ in lake_points])
+    for feature in lake_features():
+        expected = [feature.contains(x, y) for x, y in zip(xs, ys)]
+        assert feature.contains_many(xs, ys, prepared_from=prepared_from).tolist() == expected
+    collection = FeatureCollection(lake_features())
+    ids = [feature.id for feature in collection.features]
+    assert [ids[i] if i >= 0 else None for i in collection.locate_many(xs, ys)] == \
+        [expected for _, expected in lake_points]
@@ -0,0 +1,34 @@
+import io
+
+import pytest
+
+from geo.shapefile import ShapefileException
+from geo.shapefile.reader import Reader
+from geo.shapefile.writer import Writer
+
+
+def squares_writer(count=10):
+    writer = Writer()
+    writer.field('ID', 'N', 10)
+    for i in range(count):
+        writer.poly(parts=[[[i, 0], [i, 1], [i + 1, 1], [i + 1, 0], [i, 0]]])
+        writer.record(i)
+    return writer
+
+
+def test_save_shx_before_shp():
+    # the shx file indexes the records of the shp file, so there is nothing
+    # to write until that's saved
+    with pytest.raises(ShapefileException):
+        squares_writer().saveShx(io.BytesIO())
+
+
+def test_save_shp_then_shx():
+    writer = squares_writer()
+    shp, shx, dbf = io.BytesIO(), io.BytesIO(), io.BytesIO()
+    writer.saveShp(shp)
+    writer.saveShx(shx)
+    writer.saveDbf(dbf)
+    reader = Reader(shp=shp, shx=shx, dbf=dbf)
+    assert [list(point) for point in reader.shape(7).points] == [[7, 0], [7, 1], [8, 1], [8, 0], [7, 0]]
+    assert [shape.bbox[0] for shape in reader.shapes()] == list(range(10))